@@ -0,0 +1,19 @@
+import streamlit as st
+
+import startup
+
+# One process for every app: streamlit run app.py. Each page script, and so each of its
+# numpy/scipy/sympy/matplotlib/plotly imports, only runs once the page is opened.
+PAGES = [
+    st.Page("day5.py", title="Vectors, Matrices and Equations", default=True),
+    st.Page("task1.py", title="Areas and Determinants"),
+    st.Page("task2.py", title="Derivative Explorer"),
+    st.Page("task3.py", title="Function Plotter"),
+    st.Page("game.py", title="Murder Mystery Game"),
+]
+
+startup.boot()
+current = st.navigation(PAGES)
+with startup.first_load(current.title):
+    current.run()
+startup.render_report()
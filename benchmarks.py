@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Expressions used for the symbolic and critical-point benchmarks
+EXPRESSIONS = {
+    "polynomial": "x**3 - 2*x**2 + 3*x - 1",
+    "polynomial_high": "x**9 - 4*x**5 + x",
+    "trigonometric": "sin(x)*cos(2*x)",
+    "transcendental": "sin(x) + x**2/10",
+    "exponential": "exp(-x**2)*cos(3*x)",
+    "rational": "1/(1 + x**2)",
+    "logarithmic": "x*log(x**2 + 1)",
+}
+
+# Integrands for task1, written the way users type them there
+INTEGRANDS = {
+    "polynomial": "x**2",
+    "trigonometric": "np.sin(x)",
+    "oscillatory": "np.sin(20*x)*np.exp(-x)",
+}
+
+SIZES = [10, 100, 1000, 3000]
+
+
+# Time fn(setup()) until min_time has elapsed (at least min_repeats runs); setup is untimed
+def measure(fn, setup=None, min_repeats=3, min_time=0.2, max_repeats=1000):
+    fn(setup() if setup else None)
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_repeats and (len(timings) < min_repeats or time.perf_counter() - started < min_time):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - start)
+    return {
+        "median": statistics.median(timings),
+        "min": min(timings),
+        "mean": statistics.fmean(timings),
+        "repeats": len(timings),
+    }
+
+
+def bench_matrix(sizes, rng):
+    from engine import matrix_operation, solve_equations
+    from matrix_io import parse_matrix_text
+
+    cases = {}
+    for n in sizes:
+        text = "\n".join(",".join(f"{v:.6f}" for v in row) for row in rng.random((n, n)))
+        cases[f"matrix.parse_text.n{n}"] = (lambda _, text=text: parse_matrix_text(text), None)
+
+        # A fresh matrix per repeat keeps the factorization cache cold, as for a new input
+        def fresh(n=n):
+            return rng.random((n, n)) + n * np.eye(n), rng.random((n, n))
+
+        cases[f"matrix.det.n{n}"] = (lambda m: matrix_operation("Determinant", m[0]), fresh)
+        cases[f"matrix.inv.n{n}"] = (lambda m: matrix_operation("Inverse", m[0]), fresh)
+        cases[f"matrix.matmul.n{n}"] = (lambda m: matrix_operation("Multiplication", m[0], m[1]), fresh)
+        cases[f"matrix.solve.n{n}"] = (lambda m: solve_equations(m[0], m[1][:, 0]), fresh)
+    return cases
+
+
+def bench_task1():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from scipy.integrate import quad
+
+    from integration import evaluate_vectorized, integrate_many
+    from safe_expr import NumericPlan, compile_numeric
+
+    def area_and_plot(func_input):
+        func = compile_numeric(func_input)
+        quad(func, 0.0, 1.0)
+        x = np.linspace(0.0, 1.0, 100)
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.plot(x, evaluate_vectorized(func, x))
+        fig.canvas.draw()
+
+    grid = np.linspace(0.0, 1.0, 10_000_000)
+    out = np.empty_like(grid)
+    cases = {}
+    for name, func_input in INTEGRANDS.items():
+        cases[f"task1.compile.{name}"] = (lambda _, f=func_input: NumericPlan(f), None)
+        cases[f"task1.quad.{name}"] = (lambda _, f=func_input: quad(compile_numeric(f), 0.0, 1.0), None)
+        cases[f"task1.area_and_plot.{name}"] = (lambda _, f=func_input: area_and_plot(f), None)
+        cases[f"task1.evaluate_10M.{name}"] = (lambda _, f=func_input: compile_numeric(f).evaluate(grid, out), None)
+    rows = list(INTEGRANDS.values()) * 1000
+    cases["task1.integrate_many.3000_rows"] = (
+        lambda _: integrate_many(rows, np.zeros(len(rows)), np.ones(len(rows)), compile_numeric),
+        None,
+    )
+    return cases
+
+
+def bench_symbolic():
+    from critical_points import find_critical_points
+    from expr_cache import ExpressionCache, compile_expression
+    from figure_cache import clear_cache
+    from task2 import plot_function_and_tangent
+
+    grid = np.linspace(-10, 10, 400)
+    cases = {}
+    for name, expr in EXPRESSIONS.items():
+        # A private cache per call measures the full sympify/diff/lambdify pipeline
+        cases[f"symbolic.compile_cold.{name}"] = (lambda _, e=expr: ExpressionCache().get(e, order=2), None)
+        cases[f"symbolic.compile_cached.{name}"] = (lambda _, e=expr: compile_expression(e, order=2), None)
+        cases[f"task3.critical_points.{name}"] = (
+            lambda _, e=expr: find_critical_points(compile_expression(e, order=2), grid),
+            None,
+        )
+        compiled = compile_expression(expr)
+
+        # Clearing the PNG cache forces a real render each repeat
+        def render(_, e=compiled.expr):
+            clear_cache()
+            plot_function_and_tangent(e, 1.0, (-5.0, 5.0))
+
+        cases[f"task2.plot.{name}"] = (render, None)
+    return cases
+
+
+def bench_clues(rows=5000):
+    from clue_store import ClueStore, SQLiteBackend
+
+    path = os.path.join(tempfile.mkdtemp(prefix="clue-bench-"), "clues.db")
+    backend = SQLiteBackend(path)
+    backend.create_schema((f"Clue number {i}", f"Suspect {i % 7}") for i in range(rows))
+    cold = ClueStore(backend, ttl=0)
+    warm = ClueStore(backend, ttl=3600)
+    return {
+        f"game.get_clues.cold.{rows}_rows": (lambda _: cold.get_clues(), None),
+        f"game.get_clues.cached.{rows}_rows": (lambda _: warm.get_clues(), None),
+    }
+
+
+GROUPS = {
+    "matrix": lambda args, rng: bench_matrix(args.sizes, rng),
+    "task1": lambda args, rng: bench_task1(),
+    "symbolic": lambda args, rng: bench_symbolic(),
+    "game": lambda args, rng: bench_clues(),
+}
+
+
+def run(args):
+    rng = np.random.default_rng(0)
+    results = {}
+    for group in args.groups:
+        for name, (fn, setup) in GROUPS[group](args, rng).items():
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(fn, setup, min_time=args.min_time)
+            print(f"{name:48s} {results[name]['median'] * 1e3:10.3f} ms", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+# Compare medians against a baseline run; returns the names that slowed down by more than threshold
+def compare(current, baseline, threshold):
+    regressions = []
+    print(f"{'benchmark':48s} {'baseline':>11s} {'current':>11s} {'change':>8s}")
+    for name, result in sorted(current["results"].items()):
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:48s} {before['median'] * 1e3:9.3f}ms {result['median'] * 1e3:9.3f}ms {ratio - 1:+7.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the computational hot paths of the apps.")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="where to write this run's JSON")
+    parser.add_argument("-b", "--baseline", help="previous run to compare against")
+    parser.add_argument("-t", "--threshold", type=float, default=0.10, help="allowed slowdown before flagging, e.g. 0.1 = 10%%")
+    parser.add_argument("-g", "--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+    parser.add_argument("-k", "--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--sizes", type=lambda s: [int(v) for v in s.split(",")], default=SIZES,
+                        help="matrix sizes, comma-separated (default: 10,100,1000,3000)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds spent per benchmark")
+    args = parser.parse_args(argv)
+
+    current = run(args)
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(current, fh, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
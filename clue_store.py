@@ -0,0 +1,184 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Columns read from the clues table, in the order game.py indexes them
+CLUE_COLUMNS = ("id", "clue", "suspect")
+
+
+# Bounded pool of DB-API connections; connections are health-checked on checkout
+class ConnectionPool:
+    def __init__(self, connect, check, size=4, timeout=10.0):
+        self._connect = connect
+        self._check = check
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.size = size
+        self.timeout = timeout
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No database connection available within {self.timeout} s")
+        try:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._healthy(conn):
+                    return conn
+                self._close(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            self._close(conn)
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def connection(self):
+        return _PooledConnection(self)
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _healthy(self, conn):
+        try:
+            return self._check(conn)
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# Context manager that returns the connection to the pool, discarding it after an error
+class _PooledConnection:
+    def __init__(self, pool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool.acquire()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.pool.release(self.conn, broken=exc_type is not None)
+        return False
+
+
+class MySQLBackend:
+    placeholder = "%s"
+
+    def __init__(self, pool_size=4, **config):
+        # Imported here so the SQLite backend works without the MySQL driver installed
+        import mysql.connector
+
+        self.pool = ConnectionPool(
+            lambda: mysql.connector.connect(**config),
+            lambda conn: conn.ping(reconnect=False) is None,
+            size=pool_size,
+        )
+
+
+class SQLiteBackend:
+    placeholder = "?"
+
+    def __init__(self, path, pool_size=4):
+        self.path = path
+        self.pool = ConnectionPool(
+            lambda: sqlite3.connect(path, check_same_thread=False),
+            lambda conn: conn.execute("SELECT 1").fetchone() == (1,),
+            size=pool_size,
+        )
+
+    def create_schema(self, clues=()):
+        with self.pool.connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS clues (id INTEGER PRIMARY KEY, clue TEXT NOT NULL, suspect TEXT NOT NULL)")
+            conn.executemany("INSERT INTO clues (clue, suspect) VALUES (?, ?)", clues)
+            conn.commit()
+
+
+# Clue reads with keyset pagination and a TTL cache shared by all sessions
+class ClueStore:
+    def __init__(self, backend, ttl=60.0, page_size=500):
+        self.backend = backend
+        self.ttl = ttl
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._clues = None
+        self._loaded_at = 0.0
+
+    # Yield clue rows page by page instead of materializing the table at once. Each page is
+    # read with fetchall so unbuffered MySQL cursors also consume the end-of-result packet.
+    def iter_clues(self):
+        p = self.backend.placeholder
+        sql = f"SELECT {', '.join(CLUE_COLUMNS)} FROM clues WHERE id > {p} ORDER BY id LIMIT {p}"
+        last_id = -1
+        while True:
+            with self.backend.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(sql, (last_id, self.page_size))
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+            yield from rows
+            if len(rows) < self.page_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_clues(self):
+        with self._lock:
+            if self._clues is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._clues
+            self._clues = tuple(self.iter_clues())
+            self._loaded_at = time.monotonic()
+            return self._clues
+
+    def invalidate(self):
+        with self._lock:
+            self._clues = None
+
+
+# Backend chosen from the environment: MURDER_DB_BACKEND=sqlite uses MURDER_DB_PATH
+def backend_from_env():
+    if os.environ.get("MURDER_DB_BACKEND", "mysql") == "sqlite":
+        return SQLiteBackend(os.environ.get("MURDER_DB_PATH", "murder_history.db"))
+    return MySQLBackend(
+        host=os.environ.get("MURDER_DB_HOST", "localhost"),
+        user=os.environ.get("MURDER_DB_USER", "root"),
+        password=os.environ.get("MURDER_DB_PASSWORD", "gungun22"),
+        database=os.environ.get("MURDER_DB_NAME", "murder_history"),
+    )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def default_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ClueStore(backend_from_env())
+        return _store
+
+
+def set_default_store(store):
+    global _store
+    with _store_lock:
+        _store = store
@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import sympy as sp
+
+# Polynomials up to this degree may go through the exact real-root isolation path
+MAX_SYMBOLIC_DEGREE = 8
+
+
+# Sign changes of f' between neighbouring grid points, plus grid points where f' is exactly 0
+def bracket_roots(x_vals, dy_vals):
+    finite = np.isfinite(dy_vals)
+    sign = np.sign(dy_vals)
+    exact = x_vals[finite & (sign == 0)]
+    change = finite[:-1] & finite[1:] & (sign[:-1] * sign[1:] < 0)
+    idx = np.nonzero(change)[0]
+    return x_vals[idx], x_vals[idx + 1], exact
+
+
+# Safeguarded Newton iteration run on all brackets at once, falling back to bisection.
+# slopes(pts) returns f' and f'' at pts together.
+def refine_roots(slopes, lo, hi, tol=1e-12, max_iter=60, deadline=None):
+    lo = lo.astype(float).copy()
+    hi = hi.astype(float).copy()
+    f_lo = slopes(lo)[0]
+    root = 0.5 * (lo + hi)
+    for _ in range(max_iter):
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        active = (hi - lo) > tol * (1 + np.abs(root))
+        if not active.any():
+            break
+        d1, d2 = slopes(root)
+        same = np.sign(d1) == np.sign(f_lo)
+        lo = np.where(same, root, lo)
+        f_lo = np.where(same, d1, f_lo)
+        hi = np.where(same, hi, root)
+        with np.errstate(all='ignore'):
+            step = root - d1 / d2
+        inside = np.isfinite(step) & (step > lo) & (step < hi)
+        root = np.where(active, np.where(inside, step, 0.5 * (lo + hi)), root)
+    return root
+
+
+# Exact real critical points of a low-degree polynomial
+def polynomial_critical_points(deriv, var):
+    poly = sp.Poly(deriv, var)
+    return np.array([float(r) for r in poly.real_roots()], dtype=float)
+
+
+# Locate and classify maxima and minima of f on the x_vals grid
+def find_critical_points(compiled, x_vals, dy_vals=None, time_budget=0.05, symbolic=True):
+    deadline = time.perf_counter() + time_budget
+    x_vals = np.asarray(x_vals, dtype=float)
+
+    roots = None
+    deriv = compiled.derivative(1)
+    if symbolic and deriv.is_polynomial(compiled.var):
+        degree = sp.degree(deriv, compiled.var) if deriv.free_symbols else 0
+        if 0 < degree <= MAX_SYMBOLIC_DEGREE:
+            roots = polynomial_critical_points(deriv, compiled.var)
+            roots = roots[(roots >= x_vals[0]) & (roots <= x_vals[-1])]
+
+    if roots is None:
+        if dy_vals is None:
+            dy_vals = compiled.evaluate(x_vals, (1,))[0]
+        dy_vals = np.broadcast_to(dy_vals, x_vals.shape).astype(float)
+        lo, hi, exact = bracket_roots(x_vals, dy_vals)
+        refined = refine_roots(lambda pts: compiled.evaluate(pts, (1, 2)), lo, hi, deadline=deadline)
+        # Drop brackets that straddle a pole rather than a root of f'
+        d_lo, d_hi, d_root = np.abs(compiled.evaluate(np.concatenate([lo, hi, refined]), (1,))[0]).reshape(3, -1)
+        refined = refined[d_root <= 1e-6 * (1 + np.maximum(d_lo, d_hi))]
+        roots = np.concatenate([refined, exact])
+
+    curvature = compiled.evaluate(roots, (2,))[0]
+    maxima = np.sort(roots[curvature < 0])
+    minima = np.sort(roots[curvature > 0])
+    return maxima, minima
@@ -0,0 +1,27 @@
+import numpy as np
+
+from critical_points import find_critical_points
+from expr_cache import compile_expression
+from safe_expr import compile_numeric
+from sampling import adaptive_sample, evaluate_finite
+
+
+# Everything task3 plots for one function: adaptively sampled f (and f'), the classified
+# critical points, and f and f' at tangent_points evenly spaced values of t, so a slider
+# move only looks up a row. Plain arrays only, so it can run in a background job.
+def function_curves(func_str, show_derivative, lo=-10, hi=10, sample_points=1000, grid_points=400,
+                    tangent_points=None):
+    compiled = compile_expression(func_str, order=2)
+    # f is sampled through the numeric plan; the SymPy-backed expression above is only
+    # needed for f' and the critical-point search
+    f = compile_numeric(func_str)
+    curves = {}
+    curves["x"], curves["y"] = adaptive_sample(f, lo, hi, max_points=sample_points)
+    if show_derivative:
+        curves["dx"], curves["dy"] = adaptive_sample(compiled.numeric(1), lo, hi, max_points=sample_points)
+    maxima, minima = find_critical_points(compiled, np.linspace(lo, hi, grid_points))
+    curves["maxima"], curves["maxima_y"] = maxima, evaluate_finite(f, maxima)
+    curves["minima"], curves["minima_y"] = minima, evaluate_finite(f, minima)
+    if tangent_points:
+        curves["tangent_y"], curves["tangent_slope"] = compiled.evaluate(np.linspace(lo, hi, tangent_points), (0, 1))
+    return curves
@@ -1,104 +1,395 @@
+import io
+import os
+import time
+
 import streamlit as st
 import numpy as np
+import scipy.sparse as sps
+
+from engine import (
+    MATRIX_OPERATIONS,
+    SPARSE_OPERATIONS,
+    VECTOR_OPERATIONS,
+    matrix_operation,
+    solve_equations,
+    sparse_operation,
+    vector_operation,
+)
+from jobs import JobError, run_in_background
+from linalg_cache import matrix_key
+from matrix_io import load_matrix_file, load_matrix_text
+from out_of_core import MEMORY_BUDGET, needs_out_of_core, open_matrix, open_matrix_upload, out_of_core_operation
+from sparse_ops import SOLVERS, factorize_sparse, load_sparse_text, load_sparse_upload, solve_sparse
+from tracing import page, span
+from vector_stream import DATA_DIR, RAW_DTYPES, open_upload, open_vector, resolve_data_path, stream_operation
+
+# Dense operations on matrices at least this large run in a background job with a time limit
+BACKGROUND_SIZE = 200
+# Streamed results up to this size can be downloaded straight from the page
+DOWNLOAD_LIMIT = 64 * 1024 * 1024
+
+# matrix_operation, off the script thread for large inputs; repeated requests reuse the result.
+# Out-of-core operands stay on the script thread: hashing or pickling them would load them whole.
+def run_matrix_operation(operation, matrix1, matrix2=None):
+    if needs_out_of_core(matrix1, matrix2):
+        return matrix_operation(operation, matrix1, matrix2)
+    key = (operation, matrix_key(matrix1), None if matrix2 is None else matrix_key(matrix2))
+    inline = max(matrix1.shape) < BACKGROUND_SIZE
+    return run_in_background(operation, key, matrix_operation, operation, matrix1, matrix2, inline=inline)
 
 def display_matrix_order(matrix):
-    order = len(matrix)
-    st.write(f"Matrix Order: {order}x{order}")
+    rows, cols = matrix.shape
+    st.write(f"Matrix Order: {rows}x{cols}")
+
+# Read a matrix from pasted text or an uploaded CSV/.npy/.npz file
+def matrix_input(label, input_mode):
+    try:
+        if input_mode == "Upload":
+            uploaded = st.file_uploader(f"Upload {label} (.csv, .npy or .npz)", type=["csv", "npy", "npz"])
+            if uploaded is None:
+                return None
+            with span(f"load {label}"):
+                result = load_matrix_file(uploaded.name, uploaded.getvalue())
+        else:
+            text = st.text_area(f"Enter {label} (one row per line, comma-separated values)")
+            if not text.strip():
+                return None
+            with span(f"parse {label}"):
+                result = load_matrix_text(text)
+    except ValueError as e:
+        st.error(f"Could not read {label}: {e}")
+        return None
+    source = "cached" if result.cached else "parsed"
+    st.caption(f"{label.capitalize()}: {result.shape[0]}x{result.shape[1]}, {source} in {result.seconds * 1000:.1f} ms")
+    return result.matrix
+
+# Memory-map a large vector from an uploaded file or a path on the server
+def large_vector_input(label, input_mode, dtype):
+    try:
+        if input_mode == "Upload":
+            uploaded = st.file_uploader(f"Upload {label} (.npy or raw binary)", type=["npy", "bin", "raw", "dat"])
+            if uploaded is None:
+                return None
+            with span(f"load {label}"):
+                source = open_upload(uploaded.name, uploaded.getvalue(), dtype)
+        else:
+            path = st.text_input(f"Path to {label} under {DATA_DIR} (.npy or raw binary)")
+            if not path.strip():
+                return None
+            with span(f"open {label}"):
+                source = open_vector(resolve_data_path(path.strip()), dtype)
+    except (OSError, ValueError) as e:
+        st.error(f"Could not read {label}: {e}")
+        return None
+    st.caption(f"{label.capitalize()}: {len(source):,} elements of {source.vector.dtype}, memory-mapped")
+    return source
+
+def large_vector_page():
+    input_mode = st.radio("Large vector source", ["Upload", "Server path"] if DATA_DIR else ["Upload"], horizontal=True)
+    dtype = st.selectbox("Element type of raw binary files", RAW_DTYPES)
+    vec1 = large_vector_input("vector 1", input_mode, dtype)
+    vec2 = large_vector_input("vector 2", input_mode, dtype)
+    if vec1 is None or vec2 is None:
+        return
+
+    operation = st.selectbox("Select Vector Operation", VECTOR_OPERATIONS)
+    if st.button("Perform Operation"):
+        start = time.perf_counter()
+        try:
+            with span(f"stream {operation}"):
+                result = stream_operation(operation, vec1.vector, vec2.vector, key=f"{vec1.key}:{vec2.key}")
+        except ValueError as e:
+            st.error(f"Error: {e}")
+            return
+        seconds = time.perf_counter() - start
+        rate = len(vec1) / max(seconds, 1e-9)
+        if operation == "Dot Product":
+            st.write(f"Result: {result}")
+            st.caption(f"{len(vec1):,} elements in {seconds:.3f} s ({rate:,.0f} elements/s)")
+            return
+
+        stats = result.stats
+        source = "reused" if result.cached else "computed"
+        st.write(f"Result: {stats['length']:,} elements, {source} in {seconds:.3f} s ({rate:,.0f} elements/s)")
+        st.write(f"min {stats['min']:.6g}, max {stats['max']:.6g}, mean {stats['mean']:.6g}, L2 norm {stats['norm']:.6g}")
+        st.dataframe(result.preview())
+        st.caption(f"Written to {result.path}")
+        size = os.path.getsize(result.path)
+        if size <= DOWNLOAD_LIMIT:
+            with open(result.path, "rb") as fh:
+                st.download_button("Download result (.npy)", fh.read(), file_name="vector_result.npy")
+
+# Memory-map a large .npy matrix from an uploaded file or a path on the server
+def large_matrix_input(label, input_mode):
+    try:
+        if input_mode == "Upload":
+            uploaded = st.file_uploader(f"Upload {label} (.npy)", type=["npy"])
+            if uploaded is None:
+                return None
+            with span(f"load {label}"):
+                source = open_matrix_upload(uploaded.name, uploaded.getvalue())
+        else:
+            path = st.text_input(f"Path to {label} under {DATA_DIR} (.npy)")
+            if not path.strip():
+                return None
+            with span(f"open {label}"):
+                source = open_matrix(resolve_data_path(path.strip()))
+    except (OSError, ValueError) as e:
+        st.error(f"Could not read {label}: {e}")
+        return None
+    rows, cols = source.shape
+    st.caption(f"{label.capitalize()}: {rows:,}x{cols:,} {source.matrix.dtype}, memory-mapped")
+    return source
+
+def large_matrix_page():
+    input_mode = st.radio("Large matrix source", ["Upload", "Server path"] if DATA_DIR else ["Upload"], horizontal=True)
+    operation = st.selectbox("Select Matrix Operation", MATRIX_OPERATIONS)
+    budget_mb = st.number_input("Memory budget (MB)", min_value=64, value=MEMORY_BUDGET // 2**20, step=256,
+                                help="Working memory for tiles, panels and read-ahead buffers")
+    matrix1 = large_matrix_input("matrix 1", input_mode)
+    matrix2 = None
+    if operation in ("Addition", "Subtraction", "Multiplication"):
+        matrix2 = large_matrix_input("matrix 2", input_mode)
+        if matrix2 is None:
+            return
+    if matrix1 is None:
+        return
+
+    if st.button("Perform Operation"):
+        bar = st.progress(0.0, text=operation)
+        key = matrix1.key if matrix2 is None else f"{matrix1.key}:{matrix2.key}"
+        start = time.perf_counter()
+        try:
+            with span(f"out-of-core {operation}"):
+                result = out_of_core_operation(operation, matrix1.matrix, None if matrix2 is None else matrix2.matrix,
+                                               key=key, budget=budget_mb * 2**20,
+                                               progress=lambda fraction, message: bar.progress(min(fraction, 1.0), text=message))
+        except ValueError as e:
+            st.error(f"Error: {e}")
+            return
+        seconds = time.perf_counter() - start
+        bar.empty()
+        if operation == "Determinant":
+            st.write(f"Determinant of Matrix 1: {result}")
+            st.caption(f"Blocked LU in {seconds:.1f} s")
+            return
+
+        rows, cols = result.matrix.shape
+        source = "reused" if result.cached else "computed"
+        st.write(f"Result: {rows:,}x{cols:,} {result.matrix.dtype}, {source} in {seconds:.1f} s")
+        st.dataframe(result.preview())
+        st.caption(f"Written to {result.path}")
+        if os.path.getsize(result.path) <= DOWNLOAD_LIMIT:
+            with open(result.path, "rb") as fh:
+                st.download_button("Download result (.npy)", fh.read(), file_name="matrix_result.npy")
+
+# Read a sparse matrix from pasted COO triplets or an uploaded .mtx/.npz/triplet file
+def sparse_matrix_input(label, input_mode):
+    try:
+        if input_mode == "Upload":
+            uploaded = st.file_uploader(f"Upload {label} (.mtx, .npz or row,col,value .csv)", type=["mtx", "npz", "csv", "txt"])
+            if uploaded is None:
+                return None
+            with span(f"load {label}"):
+                result = load_sparse_upload(uploaded.name, uploaded.getvalue())
+        else:
+            text = st.text_area(f"Enter {label} (one row,col,value triplet per line, 0-based)")
+            if not text.strip():
+                return None
+            with span(f"parse {label}"):
+                result = load_sparse_text(text)
+    except ValueError as e:
+        st.error(f"Could not read {label}: {e}")
+        return None
+    rows, cols = result.shape
+    density = result.matrix.nnz / max(rows * cols, 1)
+    st.caption(f"{label.capitalize()}: {rows}x{cols}, {result.matrix.nnz} non-zeros ({density:.2%}), loaded in {result.seconds * 1000:.1f} ms")
+    return result.matrix
 
 def main():
     st.title("Vector, Matrix, and Equation Operations")
 
     # Select operation type
-    operation_type = st.sidebar.selectbox("Select Operation Type", ["Vector", "Matrix", "Equation Solving"])
+    operation_type = st.sidebar.selectbox("Select Operation Type", ["Vector", "Matrix", "Sparse Matrix", "Equation Solving"])
 
     if operation_type == "Vector":
         st.header("Vector Operations")
-        vec1 = st.text_input("Enter vector 1 (comma-separated values)").split(",")
-        vec2 = st.text_input("Enter vector 2 (comma-separated values)").split(",")
+        if st.toggle("Large vector mode", help="Stream memory-mapped .npy or binary files in chunks"):
+            large_vector_page()
+            return
+
+        text1 = st.text_input("Enter vector 1 (comma-separated values)")
+        text2 = st.text_input("Enter vector 2 (comma-separated values)")
+        if not text1.strip() or not text2.strip():
+            st.info("Enter both vectors to continue.")
+            return
 
-        vec1 = np.array([float(x) for x in vec1])
-        vec2 = np.array([float(x) for x in vec2])
+        try:
+            with span("parse vectors"):
+                vec1 = load_matrix_text(text1).matrix.ravel()
+                vec2 = load_matrix_text(text2).matrix.ravel()
+        except ValueError as e:
+            st.error(f"Could not read the vectors: {e}")
+            return
 
         st.write(f"Vector 1: {vec1}")
         st.write(f"Vector 2: {vec2}")
 
-        operation = st.selectbox("Select Vector Operation", ["Addition", "Subtraction", "Dot Product"])
+        operation = st.selectbox("Select Vector Operation", VECTOR_OPERATIONS)
 
         if st.button("Perform Operation"):
-            if operation == "Addition":
-                vec_sum = vec1 + vec2
-                st.write(f"Result: {vec_sum}")
-            elif operation == "Subtraction":
-                vec_diff = vec1 - vec2
-                st.write(f"Result: {vec_diff}")
-            elif operation == "Dot Product":
-                vec_dot = np.dot(vec1, vec2)
-                st.write(f"Result: {vec_dot}")
+            if vec1.shape != vec2.shape:
+                st.error(f"Vectors must have the same length ({vec1.size} vs {vec2.size}).")
+                return
+            with span(operation):
+                result = vector_operation(operation, vec1, vec2)
+            st.write(f"Result: {result}")
 
     elif operation_type == "Matrix":
         st.header("Matrix Operations")
-        matrix1_input = st.text_area("Enter matrix 1 (one row per line, comma-separated values)")
-        matrix2_input = st.text_area("Enter matrix 2 (one row per line, comma-separated values)")
+        if st.toggle("Large matrix mode", help="Tile memory-mapped .npy matrices from disk within a memory budget"):
+            large_matrix_page()
+            return
 
-        matrix1 = np.array([np.fromstring(row, dtype=float, sep=',') for row in matrix1_input.split('\n')])
-        matrix2 = np.array([np.fromstring(row, dtype=float, sep=',') for row in matrix2_input.split('\n')])
+        input_mode = st.radio("Matrix input", ["Paste", "Upload"], horizontal=True)
+        matrix1 = matrix_input("matrix 1", input_mode)
+        matrix2 = matrix_input("matrix 2", input_mode)
+        if matrix1 is None or matrix2 is None:
+            return
 
         display_matrix_order(matrix1)
         display_matrix_order(matrix2)
 
-        operation = st.selectbox("Select Matrix Operation", ["Addition", "Subtraction", "Multiplication", "Determinant", "Inverse"])
+        operation = st.selectbox("Select Matrix Operation", MATRIX_OPERATIONS)
 
         if st.button("Perform Operation"):
-            if operation == "Addition":
-                matrix_sum = matrix1 + matrix2
-                st.write(f"Result:\n{matrix_sum}")
-            elif operation == "Subtraction":
-                matrix_diff = matrix1 - matrix2
-                st.write(f"Result:\n{matrix_diff}")
-            elif operation == "Multiplication":
-                matrix_mult = np.matmul(matrix1, matrix2)
-                st.write(f"Result:\n{matrix_mult}")
-            elif operation == "Determinant":
-                det1 = np.linalg.det(matrix1)
-                det2 = np.linalg.det(matrix2)
-                st.write(f"Determinant of Matrix 1: {det1}")
-                st.write(f"Determinant of Matrix 2: {det2}")
-            elif operation == "Inverse":
+            try:
+                if operation in ("Addition", "Subtraction"):
+                    with span(operation):
+                        result = matrix_operation(operation, matrix1, matrix2)
+                    st.write(f"Result:\n{result}")
+                elif operation == "Multiplication":
+                    with span(operation):
+                        result = run_matrix_operation(operation, matrix1, matrix2)
+                    st.write(f"Result:\n{result}")
+                elif operation == "Determinant":
+                    with span("Determinant"):
+                        det1 = run_matrix_operation(operation, matrix1)
+                        det2 = run_matrix_operation(operation, matrix2)
+                    st.write(f"Determinant of Matrix 1: {det1}")
+                    st.write(f"Determinant of Matrix 2: {det2}")
+                elif operation == "Inverse":
+                    try:
+                        with span("Inverse 1"):
+                            inv1 = run_matrix_operation(operation, matrix1)
+                        st.write(f"Inverse of Matrix 1:\n{inv1}")
+                    except np.linalg.LinAlgError:
+                        st.write("Matrix 1 is not invertible.")
+
+                    try:
+                        with span("Inverse 2"):
+                            inv2 = run_matrix_operation(operation, matrix2)
+                        st.write(f"Inverse of Matrix 2:\n{inv2}")
+                    except np.linalg.LinAlgError:
+                        st.write("Matrix 2 is not invertible.")
+            except (JobError, ValueError) as e:
+                st.error(f"Error: {e}")
+
+    elif operation_type == "Sparse Matrix":
+        st.header("Sparse Matrix Operations")
+        input_mode = st.radio("Sparse matrix input", ["Paste", "Upload"], horizontal=True)
+        operation = st.selectbox("Select Sparse Operation", SPARSE_OPERATIONS)
+
+        matrix1 = sparse_matrix_input("matrix 1", input_mode)
+        if matrix1 is None:
+            return
+
+        if operation in ("Addition", "Subtraction", "Multiplication"):
+            matrix2 = sparse_matrix_input("matrix 2", input_mode)
+            if matrix2 is None:
+                return
+            if st.button("Perform Operation"):
+                try:
+                    with span(f"sparse {operation}"):
+                        result = sparse_operation(operation, matrix1, matrix2)
+                except ValueError as e:
+                    st.error(f"Error: {e}")
+                    return
+                st.write(f"Result: {result.shape[0]}x{result.shape[1]} with {result.nnz} non-zeros")
+                buffer = io.BytesIO()
+                sps.save_npz(buffer, result)
+                st.download_button("Download result (.npz)", buffer.getvalue(), file_name="result.npz")
+
+        elif operation == "Determinant":
+            if st.button("Perform Operation"):
                 try:
-                    inv1 = np.linalg.inv(matrix1)
-                    st.write(f"Inverse of Matrix 1:\n{inv1}")
-                except np.linalg.LinAlgError:
-                    st.write("Matrix 1 is not invertible.")
+                    with span("sparse Determinant"):
+                        factors = factorize_sparse(matrix1)
+                        sign, logdet = factors.slogdet()
+                    st.write(f"Determinant of Matrix 1: {factors.det()}")
+                    st.write(f"sign = {sign:+.0f}, log|det| = {logdet}")
+                except np.linalg.LinAlgError as e:
+                    st.error(f"Error: {e}")
 
+        else:
+            solver = st.selectbox("Solver", SOLVERS)
+            rhs_input = st.text_area("Enter the right-hand side b (comma-separated values, empty for all ones)")
+            if st.button("Solve"):
                 try:
-                    inv2 = np.linalg.inv(matrix2)
-                    st.write(f"Inverse of Matrix 2:\n{inv2}")
-                except np.linalg.LinAlgError:
-                    st.write("Matrix 2 is not invertible.")
+                    if rhs_input.strip():
+                        b = np.loadtxt(io.StringIO(rhs_input), delimiter=",", ndmin=1).ravel()
+                    else:
+                        b = np.ones(matrix1.shape[0])
+                    with span(f"sparse solve ({solver})"):
+                        x, info, residual, seconds = solve_sparse(matrix1, b, solver)
+                except (ValueError, np.linalg.LinAlgError) as e:
+                    st.error(f"Error: {e}")
+                    return
+                if info > 0:
+                    st.warning(f"{solver} did not converge in {info} iterations.")
+                st.write(f"Solved with {solver} in {seconds:.3f} s, relative residual {residual:.3e}")
+                st.write(f"Solution preview: {x[:10]}")
+                buffer = io.BytesIO()
+                np.save(buffer, x)
+                st.download_button("Download solution (.npy)", buffer.getvalue(), file_name="solution.npy")
 
     elif operation_type == "Equation Solving":
         st.header("Equation Solving")
-        num_equations = st.number_input("Enter the number of equations", min_value=2, step=1)
+        input_mode = st.radio("Augmented matrix input", ["Paste", "Upload"], horizontal=True)
+        num_rhs = st.number_input("Number of right-hand-side columns", min_value=1, step=1)
+        augmented = matrix_input("augmented matrix [A | B]", input_mode)
+        if augmented is None:
+            return
+        if augmented.shape[1] <= num_rhs:
+            st.error(f"The augmented matrix needs more than {num_rhs} columns.")
+            return
 
-        coefficients = []
-        constants = []
-
-        for i in range(num_equations):
-            st.subheader(f"Equation {i+1}")
-            coeff = st.text_input(f"Enter coefficients for equation {i+1} (comma-separated values)").split(",")
-            const = st.text_input(f"Enter constant for equation {i+1}")
-            coefficients.append([float(x) for x in coeff])
-            constants.append(float(const))
-
-        coefficients = np.array(coefficients)
-        constants = np.array(constants)
+        coefficients = augmented[:, :-num_rhs]
+        constants = augmented[:, -num_rhs:]
+        if num_rhs == 1:
+            constants = constants[:, 0]
+        st.write(f"{coefficients.shape[0]} equations in {coefficients.shape[1]} unknowns, {num_rhs} right-hand side(s)")
 
         if st.button("Solve Equations"):
             try:
-                solutions = np.linalg.solve(coefficients, constants)
-                st.write(f"Solutions: {solutions}")
-            except np.linalg.LinAlgError:
-                st.write("The system of equations has no solution or infinitely many solutions.")
+                with span("solve"):
+                    if needs_out_of_core(coefficients):
+                        solutions, method = solve_equations(coefficients, constants)
+                    else:
+                        key = (matrix_key(coefficients), matrix_key(constants))
+                        solutions, method = run_in_background("Solving", key, solve_equations, coefficients, constants,
+                                                              inline=max(coefficients.shape) < BACKGROUND_SIZE)
+            except (np.linalg.LinAlgError, JobError) as e:
+                st.error(f"Could not solve the system: {e}")
+                return
+            residual = np.linalg.norm(coefficients @ solutions - constants)
+            st.write(f"Solved with {method}, residual norm {residual:.3e}")
+            st.dataframe(np.atleast_2d(solutions.T).T[:100])
+
+            buffer = io.BytesIO()
+            np.save(buffer, solutions)
+            st.download_button("Download solutions (.npy)", buffer.getvalue(), file_name="solutions.npy")
 
 if __name__ == "__main__":
-    main()
+    with page("day5"):
+        main()
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import scipy.sparse as sps
+
+from linalg_cache import factorize, solve_system
+from matrix_io import parse_matrix_text
+from out_of_core import blocked_lu, memmap_key, needs_out_of_core, out_of_core_operation
+from sparse_ops import SOLVERS, factorize_sparse, load_sparse_file, solve_sparse
+from vector_stream import stream_operation
+
+VECTOR_OPERATIONS = ["Addition", "Subtraction", "Dot Product"]
+MATRIX_OPERATIONS = ["Addition", "Subtraction", "Multiplication", "Determinant", "Inverse"]
+SPARSE_OPERATIONS = ["Addition", "Subtraction", "Multiplication", "Determinant", "Solve"]
+
+
+# Memory-mapped operands (.npy job paths) are streamed in chunks instead of loaded whole
+def vector_operation(operation, vec1, vec2):
+    if isinstance(vec1, np.memmap) or isinstance(vec2, np.memmap):
+        result = stream_operation(operation, vec1.reshape(-1), vec2.reshape(-1))
+        return result if operation == "Dot Product" else result.vector
+    if operation == "Addition":
+        return vec1 + vec2
+    if operation == "Subtraction":
+        return vec1 - vec2
+    if operation == "Dot Product":
+        return np.dot(vec1, vec2)
+    raise ValueError(f"Unknown vector operation: {operation}")
+
+
+# Binary operations use both matrices; Determinant and Inverse only use matrix1. Memory-mapped
+# operands too large for the out-of-core budget are processed in tiles, with results on disk
+# cached under a key derived from the operand files.
+def matrix_operation(operation, matrix1, matrix2=None):
+    if needs_out_of_core(matrix1, matrix2):
+        result = out_of_core_operation(operation, matrix1, matrix2, key=memmap_key(matrix1, matrix2))
+        return result if operation == "Determinant" else result.matrix
+    if operation == "Addition":
+        return matrix1 + matrix2
+    if operation == "Subtraction":
+        return matrix1 - matrix2
+    if operation == "Multiplication":
+        return np.matmul(matrix1, matrix2)
+    if operation == "Determinant":
+        return factorize(matrix1).det()
+    if operation == "Inverse":
+        return factorize(matrix1).inverse()
+    raise ValueError(f"Unknown matrix operation: {operation}")
+
+
+def solve_equations(coefficients, constants):
+    square = coefficients.ndim == 2 and coefficients.shape[0] == coefficients.shape[1]
+    if square and needs_out_of_core(coefficients):
+        key = memmap_key(coefficients)
+        factors = blocked_lu(coefficients, key)
+        try:
+            return factors.solve(constants), "blocked LU (out of core)"
+        finally:
+            if not key:
+                factors.discard()
+    return solve_system(coefficients, constants)
+
+
+def sparse_operation(operation, matrix1, matrix2=None, solver=SOLVERS[0]):
+    if operation == "Addition":
+        return (matrix1 + matrix2).tocsr()
+    if operation == "Subtraction":
+        return (matrix1 - matrix2).tocsr()
+    if operation == "Multiplication":
+        return (matrix1 @ matrix2).tocsr()
+    if operation == "Determinant":
+        return factorize_sparse(matrix1).det()
+    if operation == "Solve":
+        x, info, _, _ = solve_sparse(matrix1, matrix2, solver)
+        if info > 0:
+            raise np.linalg.LinAlgError(f"{solver} did not converge in {info} iterations")
+        return x
+    raise ValueError(f"Unknown sparse operation: {operation}")
+
+
+# Job operands are inline lists or paths to .npy (memory-mapped), .npz, .mtx or CSV files
+def load_operand(value, sparse=False):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        suffix = os.path.splitext(value)[1].lower()
+        if sparse:
+            with open(value, "rb") as fh:
+                return load_sparse_file(value, fh.read())
+        if suffix == ".npy":
+            return np.load(value, mmap_mode="r", allow_pickle=False)
+        if suffix == ".npz":
+            with np.load(value, allow_pickle=False) as archive:
+                return archive[archive.files[0]]
+        with open(value, encoding="utf-8") as fh:
+            return parse_matrix_text(fh.read())
+    if sparse and isinstance(value, dict):
+        return sps.coo_matrix((value["data"], (value["row"], value["col"])), shape=value.get("shape")).tocsr()
+    return np.asarray(value, dtype=float)
+
+
+def _to_json(result, out=None):
+    if sps.issparse(result):
+        if out:
+            sps.save_npz(out, result)
+            return out
+        coo = result.tocoo()
+        return {"shape": list(coo.shape), "row": coo.row.tolist(), "col": coo.col.tolist(), "data": coo.data.tolist()}
+    if isinstance(result, np.ndarray) and result.ndim > 0:
+        if out:
+            np.save(out, result)
+            return out
+        return result.tolist()
+    return float(result)
+
+
+# Execute one job dict: {"id", "kind": vector|matrix|solve|sparse, "op", "a", "b", "solver", "out"}
+def run_job(job):
+    start = time.perf_counter()
+    response = {"id": job.get("id")}
+    try:
+        if "parse_error" in job:
+            raise ValueError(job["parse_error"])
+        kind = job["kind"]
+        op = job.get("op")
+        extra = {}
+        if kind == "vector":
+            result = vector_operation(op, load_operand(job["a"]), load_operand(job["b"]))
+        elif kind == "matrix":
+            result = matrix_operation(op, load_operand(job["a"]), load_operand(job.get("b")))
+        elif kind == "solve":
+            result, extra["method"] = solve_equations(load_operand(job["a"]), load_operand(job["b"]))
+        elif kind == "sparse":
+            second = load_operand(job.get("b"), sparse=op != "Solve")
+            result = sparse_operation(op, load_operand(job["a"], sparse=True), second, job.get("solver", SOLVERS[0]))
+        else:
+            raise ValueError(f"Unknown job kind: {kind}")
+        response.update(ok=True, result=_to_json(result, job.get("out")), **extra)
+    except Exception as e:
+        response.update(ok=False, error=f"{type(e).__name__}: {e}")
+    response["seconds"] = time.perf_counter() - start
+    return response
+
+
+def _parse_line(number, line):
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {"id": f"line {number}", "parse_error": f"Invalid JSON: {e}"}
+    job.setdefault("id", f"line {number}")
+    return job
+
+
+# Stream jobs through a process pool, keeping a bounded number in flight and writing each result as it completes
+def run_jobs(lines, output, workers=None, max_pending=None):
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 4 * workers
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            pending.add(pool.submit(run_job, _parse_line(number, line)))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                count += _write(done, output)
+        count += _write(pending, output)
+    return count
+
+
+def _write(futures, output):
+    for future in futures:
+        output.write(json.dumps(future.result()) + "\n")
+    output.flush()
+    return len(futures)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run vector, matrix and equation jobs from JSONL without Streamlit.")
+    parser.add_argument("jobs", nargs="?", default="-", help="JSONL job file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL result file, or - for stdout")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.jobs == "-" else open(args.jobs, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        count = run_jobs(source, output, args.workers)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(f"{count} jobs completed", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import sympy as sp
+
+from safe_expr import to_sympy
+
+# Shared symbolic variable used by every page
+x = sp.Symbol('x')
+
+# Rough per-entry cost of a lambdified callable (code object + namespace)
+CALLABLE_OVERHEAD = 4096
+
+
+# Parsed expression together with its derivatives and compiled NumPy callables
+class CompiledExpression:
+    def __init__(self, expr, var=x):
+        self.var = var
+        self.expr = expr
+        self.derivatives = [expr]
+        self.callables = [None]
+        self.joints = {}
+        self._lock = threading.Lock()
+
+    def derivative(self, order=1):
+        self._extend(order)
+        return self.derivatives[order]
+
+    def numeric(self, order=0):
+        self._extend(order)
+        func = self.callables[order]
+        if func is None:
+            with self._lock:
+                func = self.callables[order]
+                if func is None:
+                    func = sp.lambdify(self.var, self.derivatives[order], "numpy")
+                    self.callables[order] = func
+        return func
+
+    # One callable returning several derivative orders at once. lambdify's cse pass
+    # computes subexpressions shared between the orders (and within each) only once.
+    def joint(self, orders):
+        orders = tuple(orders)
+        self._extend(max(orders))
+        func = self.joints.get(orders)
+        if func is None:
+            with self._lock:
+                func = self.joints.get(orders)
+                if func is None:
+                    func = sp.lambdify(self.var, [self.derivatives[n] for n in orders], "numpy", cse=True)
+                    self.joints[orders] = func
+        return func
+
+    # Values of the requested orders at pts in one pass, shaped (len(orders),) + pts.shape;
+    # results with a non-negligible imaginary part become NaN
+    def evaluate(self, pts, orders=(0, 1, 2)):
+        pts = np.asarray(pts, dtype=float)
+        with np.errstate(all='ignore'):
+            results = self.joint(orders)(pts)
+        values = np.empty((len(results),) + pts.shape)
+        for i, result in enumerate(results):
+            result = np.asarray(result)
+            if np.iscomplexobj(result):
+                result = np.where(np.abs(result.imag) < 1e-12, result.real, np.nan)
+            values[i] = result
+        return values
+
+    def _extend(self, order):
+        if order < len(self.derivatives):
+            return
+        with self._lock:
+            while len(self.derivatives) <= order:
+                self.derivatives.append(sp.diff(self.derivatives[-1], self.var))
+                self.callables.append(None)
+
+    def compiled(self, order):
+        return order < len(self.callables) and all(f is not None for f in self.callables[:order + 1])
+
+    def nbytes(self):
+        size = sum(len(sp.srepr(d)) for d in self.derivatives)
+        size += CALLABLE_OVERHEAD * (sum(f is not None for f in self.callables) + len(self.joints))
+        return size
+
+
+# Process-wide LRU cache bounded by entry count and estimated memory
+class ExpressionCache:
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, func, order=1, var=x):
+        alias = (var, func.strip()) if isinstance(func, str) else None
+        with self._lock:
+            key = self._aliases.get(alias) if alias is not None else None
+            if key is not None and key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                entry = self._entries[key]
+                self._ensure(key, entry, order)
+                return entry
+
+        # Parse outside the lock so a slow input does not block other sessions
+        expr = to_sympy(func, var) if isinstance(func, str) else func
+        key = (sp.srepr(var), sp.srepr(expr))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+                entry = CompiledExpression(expr, var)
+                self._entries[key] = entry
+                self._sizes[key] = 0
+            if alias is not None:
+                self._aliases[alias] = key
+
+        self._ensure(key, entry, order)
+        return entry
+
+    def _ensure(self, key, entry, order):
+        if entry.compiled(order):
+            return
+        for n in range(order + 1):
+            entry.numeric(n)
+        with self._lock:
+            if key not in self._entries:
+                return
+            size = entry.nbytes()
+            self._bytes += size - self._sizes[key]
+            self._sizes[key] = size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            if len(self._entries) == 1:
+                break
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(key)
+            self._aliases = {a: k for a, k in self._aliases.items() if k != key}
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self._sizes.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+# Module-level instance; imported modules survive reruns, so every session shares it
+_cache = ExpressionCache()
+
+
+def compile_expression(func, order=1, var=x):
+    return _cache.get(func, order, var)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    _cache.clear()
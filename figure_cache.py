@@ -0,0 +1,85 @@
+import io
+import threading
+from collections import OrderedDict
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+
+# LRU of rendered PNG bytes bounded by a total byte budget
+class PNGCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            png = self._entries.get(key)
+            if png is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return png
+
+    def put(self, key, png):
+        if len(png) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = png
+            self._bytes += len(png)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+_cache = PNGCache()
+_local = threading.local()
+
+
+# One Agg figure per script thread, cleared and reused for every render. It is never
+# registered with pyplot, so nothing keeps it alive beyond the thread.
+def _figure():
+    fig = getattr(_local, "figure", None)
+    if fig is None:
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        _local.figure = fig
+    return fig
+
+
+# Return PNG bytes for key, calling draw(fig) on a fresh, managed figure only on a cache miss
+def render_png(key, draw, dpi=100):
+    png = _cache.get(key)
+    if png is not None:
+        return png
+    fig = _figure()
+    try:
+        draw(fig)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=dpi)
+        png = buffer.getvalue()
+    finally:
+        fig.clear()
+    _cache.put(key, png)
+    return png
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def clear_cache():
+    global _cache
+    _cache = PNGCache(_cache.max_bytes)
@@ -0,0 +1,162 @@
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+# Columns of the legacy Gradio flagging CSV, in file order
+LEGACY_COLUMNS = ["function", "x_range", "click_point", "graph", "error", "flag", "username", "timestamp"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS flags (
+    id INTEGER PRIMARY KEY,
+    row_key TEXT NOT NULL UNIQUE,
+    function TEXT,
+    x_range TEXT,
+    click_point TEXT,
+    image TEXT,
+    error TEXT,
+    flag TEXT,
+    username TEXT,
+    timestamp TEXT
+);
+CREATE INDEX IF NOT EXISTS flags_function ON flags (function);
+CREATE INDEX IF NOT EXISTS flags_timestamp ON flags (timestamp);
+"""
+
+
+# Flagged plots: images stored once under images/<sha256>.<ext>, metadata in an indexed SQLite table
+class FlagStore:
+    def __init__(self, root="flagged"):
+        self.root = root
+        self.image_dir = os.path.join(root, "images")
+        os.makedirs(self.image_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "flags.db"), check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    # Write image bytes once; identical images share one file
+    def put_image(self, data, ext="webp"):
+        digest = hashlib.sha256(data).hexdigest()
+        name = f"{digest}.{ext}"
+        path = os.path.join(self.image_dir, name)
+        if not os.path.exists(path):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        return name
+
+    def image_path(self, name):
+        return os.path.join(self.image_dir, name)
+
+    # Append one flag; re-adding an identical record is a no-op. Returns True if a row was written
+    def add(self, function, x_range="", click_point="", image=None, image_ext="webp",
+            error="", flag="", username="", timestamp=None):
+        image_name = self.put_image(image, image_ext) if image else None
+        timestamp = timestamp or datetime.now().isoformat(sep=" ")
+        record = (function, x_range, click_point, image_name, error, flag, username, timestamp)
+        row_key = hashlib.sha1(json.dumps(record).encode("utf-8")).hexdigest()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO flags (row_key, function, x_range, click_point, image, error, flag, username, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (row_key, *record),
+            )
+        return cursor.rowcount == 1
+
+    # Stream matching flags as dicts, oldest first, one page at a time
+    def iter_flags(self, function=None, start=None, end=None, page_size=500):
+        where, params = [], []
+        if function is not None:
+            where.append("function = ?")
+            params.append(function)
+        if start is not None:
+            where.append("timestamp >= ?")
+            params.append(str(start))
+        if end is not None:
+            where.append("timestamp < ?")
+            params.append(str(end))
+        where.append("id > ?")
+        sql = (
+            "SELECT id, function, x_range, click_point, image, error, flag, username, timestamp FROM flags "
+            f"WHERE {' AND '.join(where)} ORDER BY id LIMIT ?"
+        )
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(sql, (*params, last_id, page_size)).fetchall()
+            for row in rows:
+                yield dict(zip(("id", *LEGACY_COLUMNS[:3], "image", *LEGACY_COLUMNS[4:]), row))
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM flags").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+
+# Split a Gradio plot cell ({"type": ..., "plot": "data:image/webp;base64,..."}) into bytes and extension
+def decode_plot_cell(cell):
+    if not cell:
+        return None, None
+    plot = json.loads(cell).get("plot", "")
+    if not plot.startswith("data:"):
+        return None, None
+    header, payload = plot.split(",", 1)
+    ext = header[len("data:"):].split(";")[0].split("/")[-1] or "bin"
+    return base64.b64decode(payload), ext
+
+
+# One-shot import of the legacy CSV log; safe to run again since identical rows are ignored
+def migrate_csv(csv_path, store):
+    csv.field_size_limit(sys.maxsize)
+    added = 0
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        next(reader, None)
+        for row in reader:
+            values = dict(zip(LEGACY_COLUMNS, row))
+            image, ext = decode_plot_cell(values.pop("graph", ""))
+            # Gradio prefixes ranges with ' so spreadsheets do not treat them as formulas
+            values["x_range"] = values.get("x_range", "").lstrip("'")
+            added += store.add(image=image, image_ext=ext or "webp", **values)
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the flagged-plot store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="import a legacy flagged/log.csv")
+    migrate.add_argument("csv_path")
+    migrate.add_argument("--root", default="flagged")
+    listing = sub.add_parser("list", help="print flags as JSON lines")
+    listing.add_argument("--root", default="flagged")
+    listing.add_argument("--function")
+    listing.add_argument("--start")
+    listing.add_argument("--end")
+    args = parser.parse_args(argv)
+
+    store = FlagStore(args.root)
+    try:
+        if args.command == "migrate":
+            added = migrate_csv(args.csv_path, store)
+            print(f"Imported {added} flags; store now holds {store.count()}.")
+        else:
+            for flag in store.iter_flags(args.function, args.start, args.end):
+                print(json.dumps(flag))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,12 @@
 import streamlit as st
-import mysql.connector
-
-# Function to connect to the MySQL database
-def create_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="gungun22",
-        database="murder_history"
-    )
-
-# Function to get clues and suspects from the database
+
+from clue_store import default_store
+from tracing import page, span
+
+# Function to get clues and suspects from the database (pooled connection, cached with a TTL)
 def get_clues():
-    connection = create_connection()
-    cursor = connection.cursor()
-    cursor.execute("SELECT * FROM clues")
-    clues = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return clues
+    with span("get_clues"):
+        return default_store().get_clues()
 
 # Function to display the game
 def display_game():
@@ -47,4 +35,5 @@ def display_game():
 
 # Run the game
 if __name__ == "__main__":
-    display_game()
+    with page("game"):
+        display_game()
@@ -0,0 +1,8 @@
+import sys
+from multiprocessing.connection import Connection
+
+import jobs
+
+# Started by jobs._Worker with the fd of its socket and the memory limit in bytes
+if __name__ == "__main__":
+    jobs._worker_main(Connection(int(sys.argv[1])), int(sys.argv[2]))
@@ -0,0 +1,415 @@
+import importlib
+import itertools
+import multiprocessing as mp
+import os
+import pickle
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from multiprocessing.connection import Connection, wait
+
+import numpy as np
+import streamlit as st
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process address-space limit
+    resource = None
+
+MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# Per-job defaults; a job that runs longer is killed along with its worker process
+TIME_LIMIT = 30.0
+MEMORY_LIMIT = 4 * 1024 * 1024 * 1024
+# A running job nobody is waiting for any more (the user reran or left the page) is
+# cancelled after this many seconds, unless a rerun with the same inputs picks it up again
+ORPHAN_GRACE = 2.0
+# Completed results kept for reuse, bounded by their array bytes
+RESULT_CACHE_BYTES = 512 * 1024 * 1024
+# Imported by each worker before it reports ready, so job time limits exclude import time
+PRELOAD = ["numpy", "scipy.linalg", "scipy.integrate", "sympy", "engine", "integration", "curve_data"]
+# Worker entry point; it imports nothing from the server's __main__
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_worker.py")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+
+
+# Raised by Job.result() when a job was stopped rather than finishing on its own
+class JobError(RuntimeError):
+    pass
+
+
+# Set inside a worker while it runs a job so report_progress knows where to send updates
+_current = None
+
+
+# Report progress from inside a job, e.g. progress=report_progress; a no-op outside workers
+def report_progress(fraction, message=""):
+    if _current is not None:
+        conn, job_id = _current
+        conn.send((job_id, "progress", (float(fraction), message)))
+
+
+# Job loop of a worker process (see job_worker.py); returns when the server closes the connection
+def _worker_main(conn, memory_limit):
+    global _current
+    for name in PRELOAD:
+        importlib.import_module(name)
+    if resource is not None and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    conn.send((None, "ready", None))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        job_id, fn, args, kwargs = message
+        _current = (conn, job_id)
+        try:
+            reply = (job_id, DONE, fn(*args, **kwargs))
+        except MemoryError:
+            reply = (job_id, FAILED, JobError(f"The job ran out of memory (limit {memory_limit / 2**30:.1f} GB)."))
+        except Exception as e:
+            reply = (job_id, FAILED, e)
+        _current = None
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Unpicklable results or exceptions are reported by message only
+            conn.send((job_id, FAILED, JobError(f"{type(e).__name__}: {e}")))
+
+
+# One submitted computation; shared by every caller that submits the same key
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, key, fn, args, kwargs, time_limit):
+        self.id = next(self._ids)
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.time_limit = time_limit
+        self.status = QUEUED
+        self.progress = None
+        self.message = ""
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.waiters = 0
+        self.orphaned_at = None
+        self.nbytes = 0
+        self._value = None
+        self._error = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError("The job is still running.")
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def _finish(self, status, value=None, error=None):
+        self.status = status
+        self._value = value
+        self._error = error
+        self.finished = time.monotonic()
+        self.args = self.kwargs = None
+        self._done.set()
+
+
+# Workers are fresh interpreters running WORKER_SCRIPT. A multiprocessing forkserver or spawn
+# child would re-run the parent's __main__, which under Streamlit is whichever page script ran last.
+class _Worker:
+    def __init__(self, memory_limit):
+        parent, child = socket.socketpair()
+        with child:
+            self.process = subprocess.Popen([sys.executable, WORKER_SCRIPT, str(child.fileno()), str(memory_limit)],
+                                            pass_fds=[child.fileno()])
+        self.conn = Connection(parent.detach())
+        self.ready = False
+        self.job = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+
+# Cached results are shared by every session, so their arrays are made read-only; returns their size
+def _freeze(value):
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_freeze(v) for v in value.values())
+    return 64
+
+
+# Process-pool executor with per-job time and memory limits, cancellation, progress and
+# reuse of completed results. Jobs run in long-lived workers (so per-process caches stay
+# warm); a worker is killed and replaced when its job times out or is cancelled.
+class JobExecutor:
+    def __init__(self, max_workers=MAX_WORKERS, time_limit=TIME_LIMIT, memory_limit=MEMORY_LIMIT,
+                 cache_bytes=RESULT_CACHE_BYTES):
+        self.max_workers = max_workers
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.cache_bytes = cache_bytes
+        self._workers = []
+        self._queue = deque()
+        self._active = {}
+        self._results = OrderedDict()
+        self._result_bytes = 0
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = mp.Pipe(duplex=False)
+        self._wake_pending = False
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    # Return the job for key: a cached result, the job already computing it, or a new one
+    def submit(self, key, fn, *args, time_limit=None, **kwargs):
+        with self._lock:
+            job = self._results.get(key)
+            if job is not None:
+                self.hits += 1
+                self._results.move_to_end(key)
+                return job
+            job = self._active.get(key)
+            if job is not None:
+                return job
+            self.misses += 1
+            job = Job(key, fn, args, kwargs, time_limit or self.time_limit)
+            self._active[key] = job
+            self._queue.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name="job-dispatcher", daemon=True)
+                self._thread.start()
+            self._wake()
+        return job
+
+    def cancel(self, job):
+        with self._lock:
+            self._stop(job, CANCELLED, JobError("The job was cancelled."))
+            self._wake()
+
+    # At most one wake-up is ever in the pipe, so sending under the lock cannot block
+    def _wake(self):
+        if not self._wake_pending:
+            self._wake_pending = True
+            self._wake_w.send(None)
+
+    # Callers attach while they wait; a job with no waiters left is cancelled after ORPHAN_GRACE
+    def attach(self, job):
+        with self._lock:
+            job.waiters += 1
+            job.orphaned_at = None
+
+    def detach(self, job):
+        with self._lock:
+            job.waiters -= 1
+            if job.waiters == 0:
+                job.orphaned_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "queued": len(self._queue),
+                "running": sum(w.job is not None for w in self._workers),
+                "cached": len(self._results),
+                "bytes": self._result_bytes,
+            }
+
+    def _stop(self, job, status, error):
+        if job.done:
+            return
+        if job.status == QUEUED:
+            self._queue.remove(job)
+        for worker in self._workers:
+            if worker.job is job:
+                worker.kill()
+                self._workers.remove(worker)
+                self._replace()
+                break
+        self._active.pop(job.key, None)
+        job._finish(status, error=error)
+
+    def _complete(self, worker, status, value):
+        job = worker.job
+        worker.job = None
+        self._active.pop(job.key, None)
+        if status == DONE:
+            job.nbytes = _freeze(value)
+            job._finish(DONE, value=value)
+            if job.nbytes <= self.cache_bytes:
+                self._results[job.key] = job
+                self._result_bytes += job.nbytes
+                while self._result_bytes > self.cache_bytes:
+                    _, old = self._results.popitem(last=False)
+                    self._result_bytes -= old.nbytes
+        else:
+            job._finish(status, error=value)
+
+    # Start the replacement for a killed worker right away, so its imports overlap the wait
+    # for the next job
+    def _replace(self):
+        try:
+            self._workers.append(_Worker(self.memory_limit))
+        except Exception:
+            pass
+
+    # Hand queued jobs to idle ready workers, starting new workers (up to max_workers) for the rest
+    def _start_queued(self):
+        while self._queue:
+            worker = next((w for w in self._workers if w.ready and w.job is None), None)
+            if worker is None:
+                starting = sum(not w.ready for w in self._workers)
+                if starting >= len(self._queue) or len(self._workers) >= self.max_workers:
+                    return
+                try:
+                    self._workers.append(_Worker(self.memory_limit))
+                except Exception as e:
+                    self._fail_next(JobError(f"Could not start a worker process: {e}"))
+                continue
+            job = self._queue.popleft()
+            try:
+                worker.conn.send((job.id, job.fn, job.args, job.kwargs))
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                self._active.pop(job.key, None)
+                job._finish(FAILED, error=JobError(f"The job could not be sent to a worker: {e}"))
+                continue
+            worker.job = job
+            job.status = RUNNING
+            job.started = time.monotonic()
+
+    def _enforce_limits(self):
+        now = time.monotonic()
+        for job in list(self._queue):
+            if job.orphaned_at is not None and now - job.orphaned_at > ORPHAN_GRACE:
+                self._stop(job, CANCELLED, JobError("The job was cancelled because nobody was waiting for it."))
+        for worker in list(self._workers):
+            job = worker.job
+            if job is None:
+                continue
+            if now - job.started > job.time_limit:
+                self._stop(job, TIMEOUT, JobError(f"The job was stopped after its {job.time_limit:.0f} s time limit."))
+            elif job.orphaned_at is not None and now - job.orphaned_at > ORPHAN_GRACE:
+                self._stop(job, CANCELLED, JobError("The job was cancelled because nobody was waiting for it."))
+
+    def _fail_next(self, error):
+        job = self._queue.popleft()
+        self._active.pop(job.key, None)
+        job._finish(FAILED, error=error)
+
+    def _receive(self, worker):
+        try:
+            job_id, status, value = worker.conn.recv()
+        except (EOFError, OSError):
+            self._workers.remove(worker)
+            worker.kill()
+            code = worker.process.returncode
+            if worker.job is not None:
+                self._complete_dead(worker, code)
+            elif not worker.ready and self._queue:
+                # Failing a job stops a worker that cannot start from being respawned forever
+                self._fail_next(JobError(f"A worker process exited while starting (exit code {code})."))
+            return
+        if status == "ready":
+            worker.ready = True
+            return
+        if worker.job is None or job_id != worker.job.id:
+            return
+        if status == "progress":
+            worker.job.progress, worker.job.message = value
+        else:
+            self._complete(worker, status, value)
+
+    def _complete_dead(self, worker, code):
+        job = worker.job
+        self._active.pop(job.key, None)
+        job._finish(FAILED, error=JobError(f"The worker process exited unexpectedly (exit code {code})."))
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                self._enforce_limits()
+                self._start_queued()
+                watched = {w.conn: w for w in self._workers if w.job is not None or not w.ready}
+            ready = wait(list(watched) + [self._wake_r], timeout=0.1)
+            with self._lock:
+                for conn in ready:
+                    if conn is self._wake_r:
+                        self._wake_r.recv()
+                        self._wake_pending = False
+                    elif watched[conn] in self._workers:
+                        self._receive(watched[conn])
+
+
+_executor = JobExecutor()
+
+
+def submit(key, fn, *args, **kwargs):
+    return _executor.submit(key, fn, *args, **kwargs)
+
+
+def executor_stats():
+    return _executor.stats()
+
+
+# Run fn(*args, **kwargs) off the script thread and wait for it with a progress bar and a
+# Cancel button. Rerunning the page while it waits detaches from the job, so it is cancelled
+# unless the rerun submits the same inputs again. Returns the result, re-raises the job's
+# own exception, or raises JobError on timeout or cancellation. inline=True skips the
+# executor for inputs too small to be worth a round trip.
+def run_in_background(label, key, fn, *args, inline=False, time_limit=None, **kwargs):
+    if inline:
+        return fn(*args, **kwargs)
+    job = _executor.submit((fn.__module__, fn.__qualname__, key), fn, *args, time_limit=time_limit, **kwargs)
+    if not job.done:
+        placeholder = st.empty()
+        _executor.attach(job)
+        try:
+            with placeholder.container():
+                bar = st.progress(0.0, text=label)
+                if st.button("Cancel", key=f"cancel-job-{job.id}"):
+                    _executor.cancel(job)
+            while not job.wait(0.1):
+                if job.progress is not None:
+                    fraction = job.progress
+                    text = f"{label}: {job.message}" if job.message else label
+                else:
+                    fraction = job.elapsed / job.time_limit
+                    text = f"{label} ({job.status})"
+                bar.progress(min(max(fraction, 0.0), 1.0), text=f"{text} · {job.elapsed:.1f} s of {job.time_limit:.0f} s")
+        finally:
+            _executor.detach(job)
+        placeholder.empty()
+    return job.result()
@@ -0,0 +1,201 @@
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+import scipy.linalg as sla
+
+from matrix_io import content_hash
+
+
+def matrix_key(matrix):
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    return content_hash(str((matrix.shape, matrix.dtype.str)).encode(), matrix.data)
+
+
+def _require_square(matrix):
+    if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+        raise np.linalg.LinAlgError("Last 2 dimensions of the array must be square")
+
+
+# Factor a matrix once and answer det / inverse / solve / rank from the stored factors
+class Factorization:
+    def __init__(self, matrix):
+        self.matrix = np.asarray(matrix, dtype=float)
+        # Keep a private copy unless the caller already handed over a read-only array
+        if self.matrix.flags.writeable:
+            self.matrix = self.matrix.copy()
+            self.matrix.flags.writeable = False
+        self.shape = self.matrix.shape
+        self._lock = threading.Lock()
+        self._lu = None
+        self._cholesky = None
+        self._qr = None
+        self._inverse = None
+        self._tried_cholesky = False
+
+    # Cholesky is only attempted for exactly symmetric matrices and kept if it succeeds.
+    # cho_factor reads one triangle, so a tolerance would let small-scale asymmetric input through.
+    def cholesky(self):
+        _require_square(self.matrix)
+        with self._lock:
+            if not self._tried_cholesky:
+                self._tried_cholesky = True
+                if np.array_equal(self.matrix, self.matrix.T):
+                    try:
+                        self._cholesky = sla.cho_factor(self.matrix, check_finite=False)
+                    except np.linalg.LinAlgError:
+                        self._cholesky = None
+        return self._cholesky
+
+    def lu(self):
+        _require_square(self.matrix)
+        with self._lock:
+            if self._lu is None:
+                # Exactly singular input is reported by solve() instead of a warning here
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", sla.LinAlgWarning)
+                    self._lu = sla.lu_factor(self.matrix, check_finite=False)
+        return self._lu
+
+    # Column-pivoted QR, used for rank; works for rectangular matrices too
+    def qr(self):
+        with self._lock:
+            if self._qr is None:
+                r, _ = sla.qr(self.matrix, mode='r', pivoting=True, check_finite=False)
+                self._qr = r
+        return self._qr
+
+    def slogdet(self):
+        chol = self.cholesky()
+        if chol is not None:
+            return 1.0, 2.0 * np.sum(np.log(np.abs(np.diag(chol[0]))))
+        lu, piv = self.lu()
+        diag = np.diag(lu)
+        swaps = np.count_nonzero(piv != np.arange(piv.size))
+        sign = (-1.0) ** swaps * np.prod(np.sign(diag))
+        if sign == 0:
+            return 0.0, -np.inf
+        return sign, np.sum(np.log(np.abs(diag)))
+
+    def det(self):
+        sign, logdet = self.slogdet()
+        with np.errstate(over='ignore'):
+            return sign * np.exp(logdet)
+
+    # Solve for one right-hand side or a block of them; O(n^2) per column once factored
+    def solve(self, b):
+        b = np.asarray(b, dtype=float)
+        chol = self.cholesky()
+        if chol is not None:
+            return sla.cho_solve(chol, b, check_finite=False)
+        lu, piv = self.lu()
+        if np.any(np.diag(lu) == 0):
+            raise np.linalg.LinAlgError("Singular matrix")
+        return sla.lu_solve((lu, piv), b, check_finite=False)
+
+    # Reciprocal 1-norm condition estimate from the stored factors, O(n^2)
+    def rcond(self):
+        anorm = np.linalg.norm(self.matrix, 1)
+        if anorm == 0:
+            return 0.0
+        chol = self.cholesky()
+        if chol is not None:
+            c, lower = chol
+            pocon, = sla.get_lapack_funcs(('pocon',), (c,))
+            rcond, _ = pocon(c, anorm, uplo='L' if lower else 'U')
+            return rcond
+        lu, _ = self.lu()
+        gecon, = sla.get_lapack_funcs(('gecon',), (lu,))
+        rcond, _ = gecon(lu, anorm, norm='1')
+        return rcond
+
+    def inverse(self):
+        if self._inverse is None:
+            self._inverse = self.solve(np.eye(self.shape[0]))
+            self._inverse.flags.writeable = False
+        return self._inverse
+
+    def rank(self, rtol=None):
+        r = np.abs(np.diag(self.qr()))
+        if r.size == 0 or r[0] == 0:
+            return 0
+        if rtol is None:
+            rtol = max(self.shape) * np.finfo(float).eps
+        return int(np.count_nonzero(r > rtol * r[0]))
+
+    def nbytes(self):
+        size = self.matrix.nbytes
+        for part in (self._lu, self._cholesky):
+            if part is not None:
+                size += part[0].nbytes
+        for part in (self._qr, self._inverse):
+            if part is not None:
+                size += part.nbytes
+        return size
+
+
+# Process-wide LRU of factorizations keyed by matrix content, bounded by bytes
+class FactorizationCache:
+    def __init__(self, max_bytes=2 * 1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, matrix):
+        key = matrix_key(matrix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            self.misses += 1
+            entry = Factorization(matrix)
+            self._entries[key] = entry
+            self._evict()
+            return entry
+
+    # Factors are filled in lazily, so sizes are re-measured on every eviction pass
+    def _evict(self):
+        total = sum(entry.nbytes() for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes()
+
+    def stats(self):
+        with self._lock:
+            self._evict()
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache = FactorizationCache()
+
+
+# Solve A X = B for one or many right-hand sides; non-square or numerically singular
+# systems fall back to the least-squares / minimum-norm solution
+def solve_system(a, b):
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    rows, cols = a.shape
+    if rows == cols:
+        factors = factorize(a)
+        if factors.rcond() > cols * np.finfo(float).eps:
+            method = "Cholesky" if factors.cholesky() is not None else "LU"
+            return factors.solve(b), method
+    solution, _, rank, _ = np.linalg.lstsq(a, b, rcond=None)
+    if rows > cols and rank == cols:
+        method = "least squares"
+    else:
+        method = "minimum-norm least squares"
+    return solution, method
+
+
+def factorize(matrix):
+    return _cache.get(matrix)
+
+
+def cache_stats():
+    return _cache.stats()
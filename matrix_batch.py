@@ -0,0 +1,69 @@
+import io
+
+import numpy as np
+
+# Default working-set budget for one chunk of the stack
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+# Load an (N, n, n) stack from .npy bytes or a CSV with one flattened n x n matrix per row
+def load_matrix_stack(name, data):
+    if name.endswith(".npy"):
+        stack = np.load(io.BytesIO(data), allow_pickle=False)
+    else:
+        flat = np.loadtxt(io.StringIO(data.decode("utf-8")), delimiter=",", ndmin=2)
+        n = int(round(np.sqrt(flat.shape[1])))
+        if n * n != flat.shape[1]:
+            raise ValueError(f"Each CSV row must hold n*n values, got {flat.shape[1]}")
+        stack = flat.reshape(-1, n, n)
+    if stack.ndim == 2:
+        stack = stack[None]
+    if stack.ndim != 3 or stack.shape[1] != stack.shape[2]:
+        raise ValueError(f"Expected a stack of square matrices, got shape {stack.shape}")
+    return stack
+
+
+# Scale-invariant singularity test: sigma_min <= rtol * sigma_max (numpy's matrix_rank default)
+def singular_from_svd(sv, n, rtol=None):
+    if rtol is None:
+        rtol = n * np.finfo(float).eps
+    return sv[..., -1] <= rtol * sv[..., 0]
+
+
+def is_singular(matrix, rtol=None):
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.ndim < 2 or matrix.shape[-1] != matrix.shape[-2]:
+        raise np.linalg.LinAlgError("Last 2 dimensions of the array must be square")
+    sv = np.linalg.svd(matrix, compute_uv=False)
+    return bool(singular_from_svd(sv, matrix.shape[-1], rtol))
+
+
+# Batched slogdet / SVD over the stack, processed in memory-bounded chunks
+def analyze_stack(stack, rtol=None, chunk_bytes=CHUNK_BYTES):
+    count, n, _ = stack.shape
+    # slogdet and svd each keep a working copy of the chunk
+    chunk = max(1, chunk_bytes // (3 * n * n * 8))
+
+    sign = np.empty(count)
+    logdet = np.empty(count)
+    cond = np.empty(count)
+    singular = np.empty(count, dtype=bool)
+    for start in range(0, count, chunk):
+        block = np.asarray(stack[start:start + chunk], dtype=float)
+        stop = start + block.shape[0]
+        sign[start:stop], logdet[start:stop] = np.linalg.slogdet(block)
+        sv = np.linalg.svd(block, compute_uv=False)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cond[start:stop] = sv[:, 0] / sv[:, -1]
+        singular[start:stop] = singular_from_svd(sv, n, rtol)
+
+    with np.errstate(over='ignore'):
+        det = sign * np.exp(logdet)
+    return {
+        "matrix": np.arange(count),
+        "sign": sign,
+        "log10|det|": logdet / np.log(10),
+        "det": det,
+        "condition": cond,
+        "singular": singular,
+    }
@@ -0,0 +1,182 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# Uploaded .npy files are spooled here so they can be opened memory-mapped
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "maths-for-dl-matrices")
+# Least recently used spool files are deleted once the directory grows past this
+MAX_SPOOL_BYTES = 4 * 1024 * 1024 * 1024
+
+
+# Resident size of a dense or scipy.sparse matrix; memory-mapped arrays live on disk
+def matrix_nbytes(matrix):
+    if isinstance(matrix, np.memmap):
+        return 0
+    if isinstance(matrix, np.ndarray):
+        return matrix.nbytes
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+# Content-hash keyed LRU of parsed matrices, bounded by resident bytes
+class MatrixCache:
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            matrix = self._entries.get(key)
+            if matrix is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return matrix
+
+    def put(self, key, matrix):
+        # Cached arrays are shared by every session, so they must never be modified in place
+        if isinstance(matrix, np.ndarray):
+            matrix.flags.writeable = False
+        size = matrix_nbytes(matrix)
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = matrix
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                self._bytes -= matrix_nbytes(old)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+
+_cache = MatrixCache()
+
+
+# Parsed matrix plus what the UI reports about it
+class ParseResult:
+    def __init__(self, matrix, seconds, cached):
+        self.matrix = matrix
+        self.seconds = seconds
+        self.cached = cached
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+
+def content_hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+# Single-pass parser: numpy's C tokenizer reads the whole text once and reports ragged rows
+def parse_matrix_text(text, sep=','):
+    if not text.strip():
+        raise ValueError("The matrix is empty.")
+    delimiter = sep if sep.strip() else None
+    return np.loadtxt(io.StringIO(text), dtype=float, delimiter=delimiter, ndmin=2)
+
+
+# Write uploaded bytes to SPOOL_DIR once per content key so they can be memory-mapped.
+# Reuse refreshes the file's mtime, which is the order _prune_spool deletes in.
+def spool_upload(key, data, suffix=".npy"):
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, f"{key}{suffix}")
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    _prune_spool(keep=path)
+    return path
+
+
+# Delete the least recently used spool files until the directory fits MAX_SPOOL_BYTES.
+# Arrays already memory-mapped from a deleted file stay valid until they are closed.
+def _prune_spool(keep):
+    entries = []
+    for entry in os.scandir(SPOOL_DIR):
+        if entry.is_file() and not entry.name.endswith(".tmp") and entry.path != keep:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= MAX_SPOOL_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _load_npy(key, data):
+    return np.load(spool_upload(key, data), mmap_mode="r", allow_pickle=False)
+
+
+def _load_npz(data):
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        if not archive.files:
+            raise ValueError("The .npz archive is empty.")
+        return archive[archive.files[0]]
+
+
+def _check_2d(matrix):
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix, got shape {matrix.shape}.")
+    return matrix
+
+
+# Return the cached matrix for key, or build it with loader() and cache it
+def cached_load(key, loader):
+    start = time.perf_counter()
+    matrix = _cache.get(key)
+    cached = matrix is not None
+    if not cached:
+        matrix = loader()
+        _cache.put(key, matrix)
+    return ParseResult(matrix, time.perf_counter() - start, cached)
+
+
+# Parse pasted text, reusing the cached array when the content has not changed
+def load_matrix_text(text, sep=','):
+    key = content_hash(f"text:{sep}:".encode(), text.encode("utf-8"))
+    return cached_load(key, lambda: parse_matrix_text(text, sep))
+
+
+# Load an uploaded CSV / .npy / .npz file; .npy is opened memory-mapped
+def load_matrix_file(name, data, sep=','):
+    key = content_hash(data)
+
+    def loader():
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix == ".npy":
+            return _check_2d(_load_npy(key, data))
+        if suffix == ".npz":
+            return _check_2d(_load_npz(data))
+        return parse_matrix_text(data.decode("utf-8"), sep)
+
+    return cached_load(key, loader)
+
+
+def cache_stats():
+    return _cache.stats()
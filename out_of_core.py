@@ -0,0 +1,394 @@
+import itertools
+import math
+import mmap
+import os
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.linalg as sla
+
+from matrix_io import content_hash, spool_upload
+from vector_stream import OUTPUT_DIR, prune_outputs, stream_elementwise
+
+# Working memory for tiles, panels and prefetch buffers; set OUT_OF_CORE_BUDGET_MB to change it
+MEMORY_BUDGET = int(os.environ.get("OUT_OF_CORE_BUDGET_MB", "2048")) * 1024 * 1024
+# Steps read ahead of the one being computed; each costs one more set of tile buffers
+PREFETCH_DEPTH = 1
+# Tile and panel edges are multiples of this, so BLAS sees aligned, evenly sized blocks
+ALIGN = 64
+# Shared by all sessions; each running operation keeps at most PREFETCH_DEPTH reads queued
+READER_THREADS = 4
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _readers():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=READER_THREADS, thread_name_prefix="tile-reader")
+        return _pool
+
+
+# Yield load(step) for each step in order while the next `depth` steps are read on background
+# threads, so disk reads overlap the BLAS call on the current tiles
+def prefetch(steps, load, depth=PREFETCH_DEPTH):
+    pool = _readers()
+    steps = iter(steps)
+    pending = deque(pool.submit(load, step) for step in itertools.islice(steps, depth))
+    try:
+        while pending:
+            for step in itertools.islice(steps, 1):
+                pending.append(pool.submit(load, step))
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+# True when a memory-mapped operand, or the operands together, would not fit the budget in RAM
+def needs_out_of_core(*matrices, budget=MEMORY_BUDGET):
+    matrices = [m for m in matrices if m is not None]
+    return any(isinstance(m, np.memmap) for m in matrices) and sum(m.nbytes for m in matrices) > budget
+
+
+# A memory-mapped input matrix and the key its results are cached under
+class MatrixSource:
+    def __init__(self, matrix, key, path):
+        self.matrix = matrix
+        self.key = key
+        self.path = path
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+
+# Memory-map a 2-D .npy file; the header carries the shape and dtype that raw files lack
+def open_matrix(path):
+    if not path.lower().endswith(".npy"):
+        raise ValueError("Large matrices must be .npy files.")
+    stat = os.stat(path)
+    matrix = np.load(path, mmap_mode="r", allow_pickle=False)
+    if matrix.ndim != 2:
+        raise ValueError(f"Expected a 2-D matrix, got shape {matrix.shape}.")
+    if not np.issubdtype(matrix.dtype, np.number):
+        raise ValueError(f"Expected numeric data, got {matrix.dtype}.")
+    key = content_hash(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return MatrixSource(matrix, key, path)
+
+
+# Cache key for operands mapped straight from .npy files, built from the same file identity as
+# open_matrix's; None when any operand is in memory or a view, which has no stable identity
+def memmap_key(*matrices):
+    parts = []
+    for matrix in matrices:
+        if matrix is None:
+            continue
+        if not isinstance(matrix, np.memmap) or not isinstance(matrix.base, mmap.mmap):
+            return None
+        stat = os.stat(matrix.filename)
+        parts.append(f"{matrix.filename}:{stat.st_size}:{stat.st_mtime_ns}:{matrix.offset}:{matrix.shape}:{matrix.dtype}")
+    return content_hash("|".join(parts).encode())
+
+
+def open_matrix_upload(name, data):
+    key = content_hash(b"matrix:", data)
+    source = open_matrix(spool_upload(key, data, ".npy"))
+    source.key = key
+    return source
+
+
+# Matrix result stored as a read-only memory-mapped .npy file
+class MatrixResult:
+    def __init__(self, path, matrix, cached):
+        self.path = path
+        self.matrix = matrix
+        self.cached = cached
+
+    def preview(self, count=8):
+        return np.asarray(self.matrix[:count, :count])
+
+
+def _ranges(n, size):
+    return [(lo, min(lo + size, n)) for lo in range(0, n, size)]
+
+
+# Largest aligned block edge up to `limit` elements, capped at the matrix size
+def _fit(limit, length, budget):
+    if limit < ALIGN:
+        raise ValueError(f"A memory budget of {budget / 2**20:.0f} MB is too small for this matrix.")
+    return min(length, limit // ALIGN * ALIGN)
+
+
+def _work_dtype(*dtypes):
+    return np.result_type(*dtypes, np.float32)
+
+
+def _result_path(tag, key):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    name = content_hash(f"{tag}:{key}".encode()) if key else uuid.uuid4().hex
+    return os.path.join(OUTPUT_DIR, f"{name}.npy")
+
+
+# Create a temporary .npy memmap for path, run fill(out) and move it into place. With a key,
+# a finished file from an earlier run is reused; readers never see a half-written one.
+def _write_result(path, key, shape, dtype, fill, keep=()):
+    if key and os.path.exists(path):
+        return MatrixResult(path, np.load(path, mmap_mode="r"), True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+    try:
+        fill(out)
+        out.flush()
+    except BaseException:
+        del out
+        os.remove(tmp)
+        raise
+    del out
+    os.replace(tmp, path)
+    prune_outputs(path, *keep)
+    return MatrixResult(path, np.load(path, mmap_mode="r"), False)
+
+
+# Addition and subtraction stream through the vector kernels on the flattened matrices
+def matrix_elementwise(operation, a, b, key=None):
+    if a.shape != b.shape:
+        raise ValueError(f"Matrices must have the same shape ({a.shape} vs {b.shape}).")
+    if not (a.flags.c_contiguous and b.flags.c_contiguous):
+        raise ValueError("Out-of-core addition and subtraction need C-ordered .npy files.")
+    result = stream_elementwise(operation, a.reshape(-1), b.reshape(-1), key)
+    return MatrixResult(result.path, result.vector.reshape(a.shape), result.cached)
+
+
+# Output tiles in row-major order with the inner dimension walked back and forth, so the
+# tile shared by two consecutive steps is read once. Each step is (rows, cols, inner, read_a, read_b).
+def _matmul_schedule(rows, cols, inner):
+    steps = []
+    previous = None
+    for i, row in enumerate(rows):
+        for j, col in enumerate(cols if i % 2 == 0 else cols[::-1]):
+            forward = (i * len(cols) + j) % 2 == 0
+            for p in (inner if forward else inner[::-1]):
+                read_a = previous is None or previous[0] != row or previous[2] != p
+                read_b = previous is None or previous[1] != col or previous[2] != p
+                steps.append((row, col, p, read_a, read_b))
+                previous = (row, col, p)
+    return steps
+
+
+# C = A @ B in square tiles read from memory-mapped operands and written to a .npy memmap.
+# The tile edge is chosen so prefetched tiles, the accumulator and one product fit the budget.
+def blocked_matmul(a, b, key=None, budget=MEMORY_BUDGET, progress=None):
+    if a.ndim != 2 or b.ndim != 2:
+        raise ValueError("Out-of-core multiplication takes 2-D matrices.")
+    (m, k), (k2, n) = a.shape, b.shape
+    if k != k2:
+        raise ValueError(f"Matrix shapes {a.shape} and {b.shape} are not aligned for multiplication.")
+    dtype = _work_dtype(a.dtype, b.dtype)
+    buffers = 2 * (PREFETCH_DEPTH + 2) + 2
+    tile = _fit(math.isqrt(budget // (dtype.itemsize * buffers)), max(m, n, k), budget)
+    rows, cols, inner = _ranges(m, tile), _ranges(n, tile), _ranges(k, tile)
+    schedule = _matmul_schedule(rows, cols, inner)
+
+    def load(step):
+        (i0, i1), (j0, j1), (p0, p1), read_a, read_b = step
+        a_tile = np.array(a[i0:i1, p0:p1], dtype=dtype) if read_a else None
+        b_tile = np.array(b[p0:p1, j0:j1], dtype=dtype) if read_b else None
+        return a_tile, b_tile
+
+    def fill(out):
+        acc = np.empty((tile, tile), dtype)
+        product = np.empty((tile, tile), dtype)
+        a_tile = b_tile = None
+        for index, (step, (a_new, b_new)) in enumerate(zip(schedule, prefetch(schedule, load))):
+            (i0, i1), (j0, j1), _, _, _ = step
+            a_tile = a_tile if a_new is None else a_new
+            b_tile = b_tile if b_new is None else b_new
+            target = acc[:i1 - i0, :j1 - j0]
+            if index % len(inner) == 0:
+                np.matmul(a_tile, b_tile, out=target)
+            else:
+                partial = product[:i1 - i0, :j1 - j0]
+                np.matmul(a_tile, b_tile, out=partial)
+                target += partial
+            if index % len(inner) == len(inner) - 1:
+                out[i0:i1, j0:j1] = target
+                if progress is not None:
+                    tiles = (index + 1) // len(inner)
+                    progress((index + 1) / len(schedule), f"{tiles} of {len(rows) * len(cols)} output tiles")
+
+    return _write_result(_result_path("matmul", key), key, (m, n), dtype, fill)
+
+
+# Order in which LAPACK's row interchanges (0-based, relative to the panel top) leave the rows
+def _permutation(ipiv, rows):
+    perm = np.arange(rows)
+    for i, p in enumerate(ipiv):
+        perm[i], perm[p] = perm[p], perm[i]
+    return perm
+
+
+# The row interchanges of a stored LU live next to it
+def _piv_path(path):
+    return path[:-len(".npy")] + ".piv.npy"
+
+
+# Blocked LU with partial pivoting of a square matrix kept on disk. L stays in elimination
+# order: rows left of a panel are never swapped again, and solve() replays each panel's swaps.
+class BlockedLU:
+    def __init__(self, path, lu, piv, block, budget=MEMORY_BUDGET):
+        self.path = path
+        self.piv_path = _piv_path(path)
+        self.lu = lu
+        self.piv = piv
+        self.block = block
+        self.budget = budget
+        self.n = lu.shape[0]
+        self.diag = np.array(lu.diagonal())
+
+    def slogdet(self):
+        swaps = np.count_nonzero(self.piv != np.arange(self.n))
+        sign = (-1.0) ** swaps * np.prod(np.sign(self.diag))
+        if sign == 0:
+            return 0.0, -np.inf
+        return sign, np.sum(np.log(np.abs(self.diag.astype(np.float64))))
+
+    def det(self):
+        sign, logdet = self.slogdet()
+        with np.errstate(over='ignore'):
+            return sign * np.exp(logdet)
+
+    def solve(self, b, progress=None):
+        if np.any(self.diag == 0):
+            raise np.linalg.LinAlgError("Singular matrix")
+        b = np.asarray(b)
+        if b.shape[0] != self.n:
+            raise ValueError(f"The right-hand side has {b.shape[0]} rows, expected {self.n}.")
+        y = np.array(b.reshape(self.n, -1), dtype=self.lu.dtype)
+        self._substitute(y, self.block, progress)
+        return y.reshape(b.shape)
+
+    # Forward then back substitution of every column of y in place, reading the factors once
+    # in prefetched column panels of `width`. Forward panels nest inside the factorization's,
+    # whose row swaps are replayed as each one starts; updates go `width` rows at a time.
+    def _substitute(self, y, width, progress=None):
+        trsm = sla.get_blas_funcs("trsm", (y,))
+        panels = [(j0, min(j0 + width, k1)) for k0, k1 in _ranges(self.n, self.block) for j0 in range(k0, k1, width)]
+        lower = prefetch(panels, lambda r: np.array(self.lu[r[0]:, r[0]:r[1]]))
+        for index, ((k0, k1), panel) in enumerate(zip(panels, lower)):
+            if k0 % self.block == 0:
+                for i in range(k0, min(k0 + self.block, self.n)):
+                    p = self.piv[i]
+                    if p != i:
+                        y[[i, p]] = y[[p, i]]
+            y[k0:k1] = trsm(1.0, panel[:k1 - k0], y[k0:k1], lower=1, diag=1)
+            for r0, r1 in _ranges(self.n - k1, width):
+                y[k1 + r0:k1 + r1] -= panel[k1 - k0 + r0:k1 - k0 + r1] @ y[k0:k1]
+            if progress is not None:
+                progress((index + 1) / (2 * len(panels)), "forward substitution")
+        panels = panels[::-1]
+        upper = prefetch(panels, lambda r: np.array(self.lu[:r[1], r[0]:r[1]]))
+        for index, ((k0, k1), column) in enumerate(zip(panels, upper)):
+            y[k0:k1] = trsm(1.0, column[k0:], y[k0:k1], lower=0)
+            for r0, r1 in _ranges(k0, width):
+                y[r0:r1] -= column[r0:r1] @ y[k0:k1]
+            if progress is not None:
+                progress((len(panels) + index + 1) / (2 * len(panels)), "back substitution")
+
+    # Substitute as many identity columns at once as the budget holds next to a few narrow
+    # factor panels, so the factors are read once per batch rather than once per block of columns
+    def inverse(self, key=None, progress=None):
+        if np.any(self.diag == 0):
+            raise np.linalg.LinAlgError("Singular matrix")
+        columns = self.budget // (self.n * self.lu.dtype.itemsize)
+        width = _fit(max(ALIGN, columns // (4 * (PREFETCH_DEPTH + 5))), self.block, self.budget)
+        batches = _ranges(self.n, _fit(max(ALIGN, columns - (PREFETCH_DEPTH + 5) * width), self.n, self.budget))
+
+        def fill(out):
+            for index, (j0, j1) in enumerate(batches):
+                y = np.zeros((self.n, j1 - j0), self.lu.dtype)
+                y[np.arange(j0, j1), np.arange(j1 - j0)] = 1
+                report = None if progress is None else (
+                    lambda fraction, message: progress((index + fraction) / len(batches),
+                                                       f"columns {j0 + 1}-{j1} of {self.n}: {message}"))
+                self._substitute(y, width, report)
+                out[:, j0:j1] = y
+
+        return _write_result(_result_path("inverse", key), key, self.lu.shape, self.lu.dtype, fill, keep=(self.path, self.piv_path))
+
+    # Delete the factor files once nothing can reuse them (no key to look them up by)
+    def discard(self):
+        self.lu = None
+        for path in (self.path, self.piv_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Right-looking blocked LU. Each column panel is factored in memory with getrf; every column
+# strip to its right is then read once, permuted, updated with trsm and one GEMM, and written back.
+def blocked_lu(a, key=None, budget=MEMORY_BUDGET, progress=None):
+    if a.ndim != 2 or a.shape[0] != a.shape[1]:
+        raise np.linalg.LinAlgError("Last 2 dimensions of the array must be square")
+    n = a.shape[0]
+    dtype = _work_dtype(a.dtype)
+    block = _fit(budget // (n * dtype.itemsize * (PREFETCH_DEPTH + 5)), n, budget)
+    path = _result_path("lu", key)
+    piv_path = _piv_path(path)
+    if key and os.path.exists(path) and os.path.exists(piv_path):
+        return BlockedLU(path, np.load(path, mmap_mode="r"), np.load(piv_path), block, budget)
+
+    piv = np.arange(n)
+    panels = _ranges(n, block)
+
+    def fill(lu):
+        for r0, r1 in panels:
+            lu[r0:r1] = a[r0:r1]
+        for index, (k0, k1) in enumerate(panels):
+            width = k1 - k0
+            panel = np.array(lu[k0:, k0:k1])
+            getrf, = sla.get_lapack_funcs(("getrf",), (panel,))
+            # A zero pivot (info > 0) is left for det() and solve() to report
+            factors, ipiv, _ = getrf(panel, overwrite_a=True)
+            lu[k0:, k0:k1] = factors
+            piv[k0:k1] = k0 + ipiv
+            perm = _permutation(ipiv, n - k0)
+            l11, l21 = factors[:width], factors[width:]
+            trsm = sla.get_blas_funcs("trsm", (factors,))
+            strips = panels[index + 1:]
+            for (j0, j1), strip in zip(strips, prefetch(strips, lambda r: np.array(lu[k0:, r[0]:r[1]]))):
+                strip = strip[perm]
+                top = trsm(1.0, l11, strip[:width], lower=1, diag=1)
+                strip[:width] = top
+                strip[width:] -= l21 @ top
+                lu[k0:, j0:j1] = strip
+            if progress is not None:
+                progress(1 - ((n - k1) / n) ** 3, f"panel {index + 1} of {len(panels)}")
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        np.save(piv_path, piv)
+
+    result = _write_result(path, None, (n, n), dtype, fill, keep=(piv_path,))
+    return BlockedLU(path, result.matrix, piv, block, budget)
+
+
+# Run a Matrix page operation out of core. Determinant returns a float, everything else a
+# MatrixResult; Determinant and Inverse only use a. Without a key the LU is deleted afterwards.
+def out_of_core_operation(operation, a, b=None, key=None, budget=MEMORY_BUDGET, progress=None):
+    if operation in ("Addition", "Subtraction"):
+        return matrix_elementwise(operation, a, b, key)
+    if operation == "Multiplication":
+        return blocked_matmul(a, b, key, budget, progress)
+    if operation in ("Determinant", "Inverse"):
+        factors = blocked_lu(a, key, budget, progress)
+        try:
+            return factors.det() if operation == "Determinant" else factors.inverse(key, progress)
+        finally:
+            if not key:
+                factors.discard()
+    raise ValueError(f"Unknown matrix operation: {operation}")
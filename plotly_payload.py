@@ -0,0 +1,92 @@
+import numpy as np
+import plotly.graph_objects as go
+
+from tracing import note, tracing_active
+
+# Largest magnitude that survives a float32 round trip
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+
+# Largest-Triangle-Three-Buckets: keep the point in each bucket that spans the largest
+# triangle with the previously kept point and the next bucket's centroid
+def lttb(x, y, n_out):
+    n = x.size
+    if n_out >= n or n_out < 3:
+        return x, y
+    every = (n - 2) / (n_out - 2)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        stop = int((i + 1) * every) + 1
+        next_stop = min(int((i + 2) * every) + 1, n)
+        avg_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        avg_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    keep[-1] = n - 1
+    return x[keep], y[keep]
+
+
+# LTTB on each NaN-separated segment, sharing the point budget by segment length. Every kept
+# segment needs 3 points plus a NaN separator, so past max_points / 4 segments the shortest are dropped.
+def downsample(x, y, max_points):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if x.size <= max_points:
+        return x, y
+    gaps = np.nonzero(np.isnan(y))[0]
+    bounds = np.concatenate([[-1], gaps, [y.size]])
+    segments = [(lo, hi) for lo, hi in zip(bounds[:-1] + 1, bounds[1:]) if hi > lo]
+    if not segments:
+        return x[:0], y[:0]
+    keep = max(1, (max_points + 1) // 4)
+    segments = sorted(sorted(segments, key=lambda s: s[1] - s[0], reverse=True)[:keep])
+    lengths = np.array([hi - lo for lo, hi in segments])
+    spare = max(0, max_points - (len(segments) - 1) - 3 * len(segments))
+    shares = 3 + spare * lengths // lengths.sum()
+    xs, ys = [], []
+    for (lo, hi), share in zip(segments, shares):
+        sx, sy = lttb(x[lo:hi], y[lo:hi], int(share))
+        if xs:
+            xs.append([0.5 * (xs[-1][-1] + sx[0])])
+            ys.append([np.nan])
+        xs.append(sx)
+        ys.append(sy)
+    return np.concatenate(xs), np.concatenate(ys)
+
+
+# float32 arrays are sent as base64 "f4" blocks by plotly, half the size of float64
+def compact(values):
+    values = np.asarray(values, dtype=float)
+    finite = values[np.isfinite(values)]
+    if finite.size and np.abs(finite).max() >= FLOAT32_MAX:
+        return values
+    return values.astype(np.float32)
+
+
+def line_trace(x, y, max_points=400, **kwargs):
+    x, y = downsample(x, y, max_points)
+    return go.Scatter(x=compact(x), y=compact(y), mode='lines', **kwargs)
+
+
+# A straight line only needs its two endpoints
+def tangent_trace(t_value, y_t, slope, x_range, **kwargs):
+    x = np.array(x_range, dtype=float)
+    return go.Scatter(x=compact(x), y=compact(slope * (x - t_value) + y_t), mode='lines', **kwargs)
+
+
+def marker_trace(points, values, **kwargs):
+    return go.Scatter(x=compact(points), y=compact(values), mode='markers', **kwargs)
+
+
+# Serialized size of the figure, recorded on the rerun's trace so payload regressions show up.
+# Measuring costs a second to_json, so it only happens while tracing (?trace=1) is on.
+def record_figure_size(fig, name):
+    if not tracing_active():
+        return None
+    nbytes = len(fig.to_json().encode("utf-8"))
+    note(f"{name} figure payload (bytes)", nbytes)
+    return nbytes
@@ -0,0 +1,434 @@
+import ast
+import operator
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+
+import numpy as np
+import sympy as sp
+
+# Inputs longer or larger than this are rejected before anything is built
+MAX_LENGTH = 2000
+MAX_NODES = 500
+# SymPy evaluates powers of exact numbers eagerly, so 9**9**9 would never finish; constant
+# powers are capped at this many digits and exponents on other constant bases at MAX_EXPONENT
+MAX_DIGITS = 1000
+MAX_EXPONENT = 1000
+# Points per chunk; each register holds one chunk, so a handful of them stay in cache
+CHUNK_SIZE = 1 << 15
+# Grids at least this many chunks long are split across threads
+PARALLEL_CHUNKS = 8
+WORKERS = os.cpu_count() or 1
+
+# Module prefixes users may write in front of a function or constant name
+PREFIXES = {"np", "numpy", "math"}
+
+# name -> (ufunc, SymPy builder, number of arguments or a tuple of allowed counts);
+# functions without a ufunc of their own are lowered through LOWERINGS instead
+FUNCTIONS = {
+    "sin": (np.sin, sp.sin, 1),
+    "cos": (np.cos, sp.cos, 1),
+    "tan": (np.tan, sp.tan, 1),
+    "sec": (None, sp.sec, 1),
+    "csc": (None, sp.csc, 1),
+    "cot": (None, sp.cot, 1),
+    "arcsin": (np.arcsin, sp.asin, 1),
+    "arccos": (np.arccos, sp.acos, 1),
+    "arctan": (np.arctan, sp.atan, 1),
+    "sinh": (np.sinh, sp.sinh, 1),
+    "cosh": (np.cosh, sp.cosh, 1),
+    "tanh": (np.tanh, sp.tanh, 1),
+    "arcsinh": (np.arcsinh, sp.asinh, 1),
+    "arccosh": (np.arccosh, sp.acosh, 1),
+    "arctanh": (np.arctanh, sp.atanh, 1),
+    "exp": (np.exp, sp.exp, 1),
+    "expm1": (np.expm1, lambda a: sp.exp(a) - 1, 1),
+    "log": (np.log, sp.log, (1, 2)),
+    "log10": (np.log10, lambda a: sp.log(a, 10), 1),
+    "log2": (np.log2, lambda a: sp.log(a, 2), 1),
+    "log1p": (np.log1p, lambda a: sp.log(1 + a), 1),
+    "sqrt": (np.sqrt, sp.sqrt, 1),
+    "cbrt": (np.cbrt, lambda a: sp.real_root(a, 3), 1),
+    "abs": (np.abs, sp.Abs, 1),
+    "floor": (np.floor, sp.floor, 1),
+    "ceil": (np.ceil, sp.ceiling, 1),
+    "sign": (np.sign, sp.sign, 1),
+    "arctan2": (np.arctan2, sp.atan2, 2),
+    "hypot": (np.hypot, lambda a, b: sp.sqrt(a**2 + b**2), 2),
+    "maximum": (np.maximum, sp.Max, 2),
+    "minimum": (np.minimum, sp.Min, 2),
+    "power": (np.power, operator.pow, 2),
+}
+# NumericPlan chains for the functions above with no single ufunc; log(a, b) is log base b
+LOWERINGS = {
+    "sec": lambda emit, a: emit(np.reciprocal, emit(np.cos, a)),
+    "csc": lambda emit, a: emit(np.reciprocal, emit(np.sin, a)),
+    "cot": lambda emit, a: emit(np.true_divide, emit(np.cos, a), emit(np.sin, a)),
+    "log": lambda emit, a, base=None: (emit(np.log, a) if base is None
+                                       else emit(np.true_divide, emit(np.log, a), emit(np.log, base))),
+}
+# Spellings from math and SymPy that mean the same thing
+ALIASES = {
+    "asin": "arcsin", "acos": "arccos", "atan": "arctan",
+    "asinh": "arcsinh", "acosh": "arccosh", "atanh": "arctanh",
+    "ln": "log", "fabs": "abs", "absolute": "abs", "Abs": "abs",
+    "ceiling": "ceil", "atan2": "arctan2", "pow": "power",
+}
+CONSTANTS = {"pi": (np.pi, sp.pi), "e": (np.e, sp.E), "E": (np.e, sp.E)}
+
+BINARY = {
+    ast.Add: (np.add, operator.add),
+    ast.Sub: (np.subtract, operator.sub),
+    ast.Mult: (np.multiply, operator.mul),
+    ast.Div: (np.true_divide, operator.truediv),
+    ast.Pow: (np.power, operator.pow),
+    ast.Mod: (np.mod, sp.Mod),
+    ast.FloorDiv: (np.floor_divide, lambda a, b: sp.floor(a / b)),
+}
+UNARY = {
+    ast.USub: (np.negative, operator.neg),
+    ast.UAdd: (None, operator.pos),
+}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def _function_name(node):
+    if isinstance(node, ast.Name):
+        name = node.id
+    elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in PREFIXES:
+        name = node.attr
+    else:
+        raise ExpressionError("Only plain function names such as sin or np.sin can be called.")
+    return ALIASES.get(name, name)
+
+
+# Parse text and reject everything except numbers, the variable, known constants,
+# arithmetic and calls to whitelisted functions
+def parse(text, var="x"):
+    text = text.strip()
+    if not text:
+        raise ExpressionError("The expression is empty.")
+    if len(text) > MAX_LENGTH:
+        raise ExpressionError(f"The expression is longer than {MAX_LENGTH} characters.")
+    # ^ means a power, as in SymPy; swapping it before parsing also gives it the right precedence
+    try:
+        tree = ast.parse(text.replace("^", "**"), mode="eval")
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        raise ExpressionError(f"Invalid expression: {e}") from None
+
+    # ast.walk is breadth-first, so names already checked as a callee or module prefix
+    # are marked before they are reached
+    count = 0
+    checked = set()
+    for node in ast.walk(tree.body):
+        count += 1
+        if count > MAX_NODES:
+            raise ExpressionError(f"The expression has more than {MAX_NODES} terms.")
+        if id(node) in checked:
+            continue
+        if isinstance(node, ast.BinOp):
+            if type(node.op) not in BINARY:
+                raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in UNARY:
+                raise ExpressionError(f"Unsupported operator: {type(node.op).__name__}")
+        elif isinstance(node, ast.Call):
+            name = _function_name(node.func)
+            if name not in FUNCTIONS:
+                raise ExpressionError(f"Unknown function: {name}")
+            counts = FUNCTIONS[name][2]
+            counts = counts if isinstance(counts, tuple) else (counts,)
+            if node.keywords or len(node.args) not in counts:
+                raise ExpressionError(f"{name} takes {' or '.join(map(str, counts))} argument(s).")
+            checked.add(id(node.func))
+            if isinstance(node.func, ast.Attribute):
+                checked.add(id(node.func.value))
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ExpressionError(f"Unsupported literal: {node.value!r}")
+        elif isinstance(node, ast.Name):
+            if node.id != var and node.id not in CONSTANTS:
+                raise ExpressionError(f"Unknown name: {node.id} (the variable is {var})")
+        elif isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id in PREFIXES):
+                raise ExpressionError("Attribute access is not allowed.")
+            if node.attr not in CONSTANTS:
+                raise ExpressionError(f"Unknown name: {node.value.id}.{node.attr}")
+            checked.add(id(node.value))
+        elif not isinstance(node, (ast.operator, ast.unaryop, ast.expr_context)):
+            raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+    _fold(tree.body, var)
+    return tree.body
+
+
+# Exact value of an integer or rational subexpression (None for anything else), checking
+# every power on the way so no constant power too large to build gets through
+def _fold(node, var):
+    if isinstance(node, ast.Constant):
+        return Fraction(node.value) if isinstance(node.value, int) else None
+    if isinstance(node, ast.UnaryOp):
+        value = _fold(node.operand, var)
+        return -value if value is not None and isinstance(node.op, ast.USub) else value
+    if isinstance(node, ast.BinOp):
+        left, right = _fold(node.left, var), _fold(node.right, var)
+        if isinstance(node.op, ast.Pow):
+            return _fold_power(node.left, left, right, var)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left - right
+        if isinstance(node.op, ast.Mult):
+            return left * right
+        if isinstance(node.op, ast.Div) and right:
+            return left / right
+        return None
+    if isinstance(node, ast.Call):
+        args = [_fold(arg, var) for arg in node.args]
+        if _function_name(node.func) == "power":
+            return _fold_power(node.args[0], *args, var)
+    return None
+
+
+def _fold_power(base_node, base, exponent, var):
+    if exponent is None:
+        return None
+    if base is not None and exponent.denominator == 1:
+        bits = max(abs(base.numerator), base.denominator).bit_length() - 1
+        # log10(2) > 0.3, so this undercounts the digits of the result by under 1%
+        if abs(exponent) * bits * 3 > MAX_DIGITS * 10:
+            raise ExpressionError(f"A constant power has more than {MAX_DIGITS} digits.")
+        try:
+            return base ** int(exponent)
+        except ZeroDivisionError:
+            return None
+    if abs(exponent) > MAX_EXPONENT and not any(isinstance(n, ast.Name) and n.id == var
+                                                for n in ast.walk(base_node)):
+        raise ExpressionError(f"Exponents of constants are limited to {MAX_EXPONENT}.")
+    return None
+
+
+# Build a SymPy expression from validated text without going through sympify's eval
+def to_sympy(text, var=None):
+    var = var if var is not None else sp.Symbol('x')
+    node = parse(text, var.name)
+
+    def build(node):
+        if isinstance(node, ast.Constant):
+            return sp.Integer(node.value) if isinstance(node.value, int) else sp.Float(node.value)
+        if isinstance(node, ast.Name):
+            return var if node.id == var.name else CONSTANTS[node.id][1]
+        if isinstance(node, ast.Attribute):
+            return CONSTANTS[node.attr][1]
+        if isinstance(node, ast.BinOp):
+            return BINARY[type(node.op)][1](build(node.left), build(node.right))
+        if isinstance(node, ast.UnaryOp):
+            return UNARY[type(node.op)][1](build(node.operand))
+        return FUNCTIONS[_function_name(node.func)][1](*[build(arg) for arg in node.args])
+
+    return sp.sympify(build(node))
+
+
+# Operands of an instruction: the input chunk, the output chunk, or a register
+INPUT = 0
+OUTPUT = 1
+
+
+# A validated expression lowered to a straight-line list of ufunc calls. Every call writes
+# into a preallocated chunk-sized register (or the output), registers are reused as soon
+# as their value is dead, and constant subexpressions are folded at compile time.
+class NumericPlan:
+    def __init__(self, text, var="x"):
+        self.source = text
+        self.var = var
+        self._ssa = []
+        result = self._lower(parse(text, var))
+        self.constant = result if isinstance(result, float) else None
+        self.instructions, self.registers = self._allocate(result)
+        del self._ssa
+
+    def _emit(self, ufunc, *args):
+        if all(isinstance(a, float) for a in args):
+            with np.errstate(all='ignore'):
+                return float(ufunc(*args))
+        self._ssa.append((ufunc, args))
+        return ("tmp", len(self._ssa) - 1)
+
+    def _lower(self, node):
+        if isinstance(node, ast.Constant):
+            try:
+                return float(node.value)
+            except OverflowError:
+                raise ExpressionError(f"The number {node.value} is too large.") from None
+        if isinstance(node, ast.Name):
+            return ("var",) if node.id == self.var else float(CONSTANTS[node.id][0])
+        if isinstance(node, ast.Attribute):
+            return float(CONSTANTS[node.attr][0])
+        if isinstance(node, ast.UnaryOp):
+            operand = self._lower(node.operand)
+            ufunc = UNARY[type(node.op)][0]
+            return operand if ufunc is None else self._emit(ufunc, operand)
+        if isinstance(node, ast.BinOp):
+            left, right = self._lower(node.left), self._lower(node.right)
+            ufunc = BINARY[type(node.op)][0]
+            if ufunc is np.power and not isinstance(left, float):
+                if right == 2.0:
+                    return self._emit(np.square, left)
+                if right == 0.5:
+                    return self._emit(np.sqrt, left)
+                if right == -1.0:
+                    return self._emit(np.reciprocal, left)
+            return self._emit(ufunc, left, right)
+        name = _function_name(node.func)
+        args = [self._lower(arg) for arg in node.args]
+        if name in LOWERINGS:
+            return LOWERINGS[name](self._emit, *args)
+        return self._emit(FUNCTIONS[name][0], *args)
+
+    # Linear-scan register allocation over the SSA list. Ufuncs are elementwise, so an
+    # instruction may write into the register of an operand that dies with it.
+    def _allocate(self, result):
+        if not isinstance(result, tuple) or result[0] != "tmp":
+            return [], 0
+        last_use = {}
+        for i, (_, args) in enumerate(self._ssa):
+            for a in args:
+                if isinstance(a, tuple) and a[0] == "tmp":
+                    last_use[a[1]] = i
+
+        slot_of, free, registers, instructions = {}, [], 0, []
+        for i, (ufunc, args) in enumerate(self._ssa):
+            operands = []
+            for a in args:
+                if isinstance(a, float):
+                    operands.append((False, a))
+                elif a[0] == "var":
+                    operands.append((True, INPUT))
+                else:
+                    operands.append((True, slot_of[a[1]]))
+            for a in args:
+                if isinstance(a, tuple) and a[0] == "tmp" and last_use[a[1]] == i and slot_of[a[1]] not in free:
+                    free.append(slot_of[a[1]])
+            if i == result[1]:
+                dest = OUTPUT
+            elif free:
+                dest = free.pop()
+            else:
+                dest = 2 + registers
+                registers += 1
+            slot_of[i] = dest
+            instructions.append((ufunc, tuple(operands), dest))
+        return instructions, registers
+
+    def _run(self, x, out, start, stop, chunk_size):
+        registers = np.empty((self.registers, min(chunk_size, stop - start)))
+        with np.errstate(all='ignore'):
+            for lo in range(start, stop, chunk_size):
+                hi = min(lo + chunk_size, stop)
+                slots = [x[lo:hi], out[lo:hi]] + [r[:hi - lo] for r in registers]
+                for ufunc, operands, dest in self.instructions:
+                    ufunc(*[slots[v] if is_slot else v for is_slot, v in operands], out=slots[dest])
+
+    # Evaluate on an array of any shape into out (allocated if not given). Large grids are
+    # cut into chunks and the chunks shared between threads; ufuncs release the GIL.
+    def evaluate(self, x, out=None, chunk_size=CHUNK_SIZE, workers=None):
+        x = np.asarray(x, dtype=float)
+        if out is None:
+            out = np.empty_like(x, order="C")
+        flat_x = np.ascontiguousarray(x).reshape(-1)
+        flat_out = out.reshape(-1)
+        if self.constant is not None:
+            flat_out.fill(self.constant)
+            return out
+        if not self.instructions:
+            np.copyto(flat_out, flat_x)
+            return out
+
+        n = flat_x.size
+        chunks = -(-n // chunk_size)
+        workers = min(workers or WORKERS, chunks)
+        if workers <= 1 or chunks < PARALLEL_CHUNKS:
+            self._run(flat_x, flat_out, 0, n, chunk_size)
+            return out
+        per_worker = -(-chunks // workers) * chunk_size
+        futures = [
+            _executor().submit(self._run, flat_x, flat_out, start, min(start + per_worker, n), chunk_size)
+            for start in range(0, n, per_worker)
+        ]
+        for future in futures:
+            future.result()
+        return out
+
+    # Scalars (as quad passes them) skip the buffers; arrays go through evaluate
+    def __call__(self, x):
+        if np.ndim(x) == 0:
+            if self.constant is not None:
+                return self.constant
+            slots = [float(x), None] + [None] * self.registers
+            with np.errstate(all='ignore'):
+                for ufunc, operands, dest in self.instructions:
+                    slots[dest] = ufunc(*[slots[v] if is_slot else v for is_slot, v in operands])
+            return float(slots[OUTPUT] if self.instructions else slots[INPUT])
+        return self.evaluate(x)
+
+    def __repr__(self):
+        return f"NumericPlan({self.source!r}, {len(self.instructions)} ops, {self.registers} registers)"
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="safe-expr")
+        return _pool
+
+
+# Compiled plans are tiny, so a plain LRU by text is enough; shared by every session
+class PlanCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, var="x"):
+        key = (var, text.strip())
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return plan
+            self.misses += 1
+        plan = NumericPlan(text, var)
+        with self._lock:
+            self._entries[key] = plan
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return plan
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+_cache = PlanCache()
+
+
+def compile_numeric(text, var="x"):
+    return _cache.get(text, var)
+
+
+def cache_stats():
+    return _cache.stats()
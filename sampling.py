@@ -0,0 +1,82 @@
+import numpy as np
+
+
+# Evaluate on an array; complex results, infinities and domain errors all become NaN
+def evaluate_finite(func, x):
+    with np.errstate(all='ignore'):
+        y = np.asarray(func(x))
+    if np.iscomplexobj(y):
+        y = np.where(np.abs(y.imag) < 1e-12, y.real, np.nan)
+    y = np.broadcast_to(y.astype(float), x.shape).copy()
+    y[~np.isfinite(y)] = np.nan
+    return y
+
+
+# Vertical extent used to turn the relative tolerance into an absolute one
+def _scale(y):
+    finite = y[np.isfinite(y)]
+    if finite.size == 0:
+        return 1.0
+    lo, hi = np.percentile(finite, [5, 95])
+    return max(hi - lo, np.abs(finite).max() * 1e-6, 1e-12)
+
+
+# Bisect each candidate interval towards its larger half-step. A continuous function's step
+# shrinks to nothing while a jump or pole keeps (or grows) its height, and a NaN means a
+# domain gap; either way the interval really needs a break in the plotted line.
+def confirm_jumps(func, xl, xr, yl, yr, threshold, iterations=40):
+    gap = np.zeros(xl.size, dtype=bool)
+    for _ in range(iterations):
+        xm = 0.5 * (xl + xr)
+        ym = evaluate_finite(func, xm)
+        gap |= np.isnan(ym)
+        go_left = np.abs(ym - yl) >= np.abs(yr - ym)
+        xr, yr = np.where(go_left, xm, xr), np.where(go_left, ym, yr)
+        xl, yl = np.where(go_left, xl, xm), np.where(go_left, yl, ym)
+    return gap | (np.abs(yr - yl) > threshold)
+
+
+# Sample func on [a, b], refining only intervals whose midpoint disagrees with linear
+# interpolation, up to max_points. Discontinuities that survive refinement and
+# domain-error edges become NaN gaps so plotted lines break there.
+def adaptive_sample(func, a, b, initial=65, max_points=1000, tol=1e-3, max_rounds=12, jump=0.05):
+    x = np.linspace(a, b, initial)
+    y = evaluate_finite(func, x)
+    scale = _scale(y)
+    active = np.ones(x.size - 1, dtype=bool)
+
+    for _ in range(max_rounds):
+        budget = max_points - x.size
+        idx = np.nonzero(active)[0]
+        if idx.size == 0 or budget <= 0:
+            break
+        xm = 0.5 * (x[idx] + x[idx + 1])
+        ym = evaluate_finite(func, xm)
+        linear = 0.5 * (y[idx] + y[idx + 1])
+        finite = np.isfinite(ym) & np.isfinite(linear)
+        err = np.where(finite, np.abs(ym - linear), np.inf)
+        # Intervals entirely outside the domain need no further points
+        err[np.isnan(ym) & np.isnan(y[idx]) & np.isnan(y[idx + 1])] = 0.0
+        refine = err > tol * scale
+        if np.count_nonzero(refine) > budget:
+            keep = np.argsort(err)[::-1][:budget]
+            refine = np.zeros_like(refine)
+            refine[keep] = True
+
+        split = idx[refine]
+        x = np.insert(x, split + 1, xm[refine])
+        y = np.insert(y, split + 1, ym[refine])
+        # Each split interval becomes two active halves; everything else has converged
+        first = split + np.arange(split.size)
+        active = np.zeros(x.size - 1, dtype=bool)
+        active[first] = True
+        active[first + 1] = True
+
+    threshold = jump * scale
+    breaks = np.nonzero(active & (np.abs(np.diff(y)) > threshold))[0]
+    if breaks.size:
+        breaks = breaks[confirm_jumps(func, x[breaks], x[breaks + 1], y[breaks], y[breaks + 1], threshold)]
+    if breaks.size:
+        x = np.insert(x, breaks + 1, 0.5 * (x[breaks] + x[breaks + 1]))
+        y = np.insert(y, breaks + 1, np.nan)
+    return x, y
@@ -0,0 +1,217 @@
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import scipy.io
+import scipy.sparse as sps
+import scipy.sparse.linalg as spla
+
+from matrix_io import cached_load, content_hash
+
+SOLVERS = ["Direct (SuperLU)", "CG", "GMRES + ILU"]
+
+
+# COO triplets "row,col,value" (0-based), one per line; shape is inferred unless given
+def parse_coo_text(text, shape=None):
+    if not text.strip():
+        raise ValueError("The matrix is empty.")
+    triplets = np.loadtxt(io.StringIO(text), dtype=float, delimiter=",", ndmin=2)
+    if triplets.shape[1] != 3:
+        raise ValueError(f"Expected row,col,value triplets, got {triplets.shape[1]} columns.")
+    rows = triplets[:, 0].astype(np.int64)
+    cols = triplets[:, 1].astype(np.int64)
+    if np.any(rows != triplets[:, 0]) or np.any(cols != triplets[:, 1]) or rows.min() < 0 or cols.min() < 0:
+        raise ValueError("Row and column indices must be non-negative integers.")
+    if shape is None:
+        shape = (int(rows.max()) + 1, int(cols.max()) + 1)
+    # Duplicate entries are summed, as in the COO convention
+    return sps.coo_matrix((triplets[:, 2], (rows, cols)), shape=shape).tocsr()
+
+
+def load_sparse_file(name, data):
+    suffix = os.path.splitext(name)[1].lower()
+    if suffix == ".mtx":
+        matrix = scipy.io.mmread(io.BytesIO(data))
+    elif suffix == ".npz":
+        matrix = sps.load_npz(io.BytesIO(data))
+    else:
+        return parse_coo_text(data.decode("utf-8"))
+    if not sps.issparse(matrix):
+        matrix = sps.csr_matrix(matrix)
+    return matrix.tocsr()
+
+
+def load_sparse_text(text):
+    key = content_hash(b"coo:", text.encode("utf-8"))
+    return cached_load(key, lambda: parse_coo_text(text))
+
+
+def load_sparse_upload(name, data):
+    key = content_hash(b"sparse:", name.encode("utf-8"), data)
+    return cached_load(key, lambda: load_sparse_file(name, data))
+
+
+def sparse_key(matrix):
+    matrix = matrix.tocsr()
+    return content_hash(
+        str(matrix.shape).encode(),
+        np.ascontiguousarray(matrix.indptr).data,
+        np.ascontiguousarray(matrix.indices).data,
+        np.ascontiguousarray(matrix.data, dtype=float).data,
+    )
+
+
+def _permutation_sign(perm):
+    # Parity is n minus the number of cycles. Pointer jumping labels every element with the
+    # smallest index on its cycle in O(log n) vectorized rounds; each cycle keeps one fixed label.
+    labels = np.arange(perm.size)
+    jump = np.asarray(perm)
+    while True:
+        merged = np.minimum(labels, labels[jump])
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+        jump = jump[jump]
+    cycles = np.count_nonzero(labels == np.arange(perm.size))
+    return -1.0 if (perm.size - cycles) % 2 else 1.0
+
+
+def _factor_nbytes(factors):
+    # SuperLU stores each non-zero of L and U as a float64 value and an int32 row index
+    return 0 if factors is None else factors.nnz * 12
+
+
+# Sparse LU and ILU factors for one CSR matrix, computed on first use. on_factor, if given,
+# is called after a factorization so the owning cache can re-check its size.
+class SparseFactorization:
+    def __init__(self, matrix, on_factor=None):
+        self.matrix = matrix.tocsc()
+        self.shape = matrix.shape
+        self._lock = threading.Lock()
+        self._lu = None
+        self._ilu = None
+        self._slogdet = None
+        self._on_factor = on_factor
+
+    @property
+    def nbytes(self):
+        matrix = self.matrix
+        return (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+                + _factor_nbytes(self._lu) + _factor_nbytes(self._ilu))
+
+    def _factored(self):
+        if self._on_factor is not None:
+            self._on_factor()
+
+    def lu(self):
+        if self.shape[0] != self.shape[1]:
+            raise np.linalg.LinAlgError("Last 2 dimensions of the array must be square")
+        with self._lock:
+            if self._lu is not None:
+                return self._lu
+            try:
+                self._lu = spla.splu(self.matrix)
+            except RuntimeError as e:
+                raise np.linalg.LinAlgError(str(e)) from e
+        self._factored()
+        return self._lu
+
+    def ilu(self):
+        if self.shape[0] != self.shape[1]:
+            raise np.linalg.LinAlgError("Last 2 dimensions of the array must be square")
+        with self._lock:
+            if self._ilu is not None:
+                return self._ilu
+            try:
+                self._ilu = spla.spilu(self.matrix, drop_tol=1e-4, fill_factor=10)
+            except RuntimeError as e:
+                raise np.linalg.LinAlgError(str(e)) from e
+        self._factored()
+        return self._ilu
+
+    # log|det| from diag(U); L has a unit diagonal, the row/column permutations supply the sign.
+    # Computed once per factorization, like the factors themselves.
+    def slogdet(self):
+        if self._slogdet is not None:
+            return self._slogdet
+        try:
+            lu = self.lu()
+        except np.linalg.LinAlgError as e:
+            if "singular" in str(e).lower():
+                return 0.0, -np.inf
+            raise
+        diag = lu.U.diagonal()
+        sign = np.prod(np.sign(diag)) * _permutation_sign(lu.perm_r) * _permutation_sign(lu.perm_c)
+        self._slogdet = (0.0, -np.inf) if sign == 0 else (sign, np.sum(np.log(np.abs(diag))))
+        return self._slogdet
+
+    def det(self):
+        sign, logdet = self.slogdet()
+        with np.errstate(over='ignore'):
+            return sign * np.exp(logdet)
+
+    def solve(self, b, solver=SOLVERS[0], rtol=1e-10, maxiter=None):
+        b = np.asarray(b, dtype=float)
+        if solver == "CG":
+            x, info = spla.cg(self.matrix, b, rtol=rtol, maxiter=maxiter)
+        elif solver == "GMRES + ILU":
+            ilu = self.ilu()
+            preconditioner = spla.LinearOperator(self.shape, ilu.solve)
+            x, info = spla.gmres(self.matrix, b, rtol=rtol, maxiter=maxiter, M=preconditioner)
+        else:
+            return self.lu().solve(b), 0
+        if info < 0:
+            raise np.linalg.LinAlgError(f"{solver} failed with illegal input (info={info})")
+        return x, info
+
+
+# LRU of sparse factorizations keyed by matrix content, bounded by the bytes of the matrices
+# and their LU/ILU factors. Factors grow an entry after it is cached, so each one re-trims.
+class SparseFactorizationCache:
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, matrix):
+        key = sparse_key(matrix)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = SparseFactorization(matrix, on_factor=self._trim)
+                self._entries[key] = entry
+            else:
+                self._entries.move_to_end(key)
+        self._trim()
+        return entry
+
+    # Evict least recently used entries until the total fits; the newest entry always stays
+    def _trim(self):
+        with self._lock:
+            total = sum(entry.nbytes for entry in self._entries.values())
+            while total > self.max_bytes and len(self._entries) > 1:
+                _, old = self._entries.popitem(last=False)
+                total -= old.nbytes
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": sum(entry.nbytes for entry in self._entries.values())}
+
+
+_cache = SparseFactorizationCache()
+
+
+def factorize_sparse(matrix):
+    return _cache.get(matrix)
+
+
+# Run one sparse solve and report timing and the relative residual
+def solve_sparse(matrix, b, solver=SOLVERS[0]):
+    start = time.perf_counter()
+    x, info = factorize_sparse(matrix).solve(b, solver)
+    seconds = time.perf_counter() - start
+    residual = np.linalg.norm(matrix @ x - b) / max(np.linalg.norm(b), np.finfo(float).tiny)
+    return x, info, residual, seconds
@@ -0,0 +1,88 @@
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Set PREWARM=0 to skip compiling and rendering task2's built-in functions at boot
+PREWARM = os.environ.get("PREWARM", "1").lower() not in ("0", "false", "no")
+
+# Imported modules survive reruns, so this module holds the per-process launcher state
+_lock = threading.Lock()
+_booted = None
+_cold_start = None
+_first_loads = {}
+_warmup = {"status": "disabled" if not PREWARM else "pending", "seconds": None, "functions": 0, "error": ""}
+
+
+# Once per process: start the cold-start clock and the warm-up thread
+def boot():
+    global _booted
+    with _lock:
+        if _booted is not None:
+            return
+        _booted = time.perf_counter()
+    if PREWARM:
+        threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+
+
+def _prewarm():
+    start = time.perf_counter()
+    _warmup["status"] = "running"
+    try:
+        import task2
+
+        _warmup["functions"] = task2.prewarm()
+        _warmup["status"] = "done"
+    except Exception as e:
+        _warmup["status"] = "failed"
+        _warmup["error"] = f"{type(e).__name__}: {e}"
+    _warmup["seconds"] = time.perf_counter() - start
+    logger.info("prewarm %s in %.2f s", _warmup["status"], _warmup["seconds"])
+
+
+# Time a page's first run in this process, which is when its heavy imports happen
+@contextmanager
+def first_load(name):
+    with _lock:
+        first = name not in _first_loads
+        if first:
+            _first_loads[name] = None
+    if not first:
+        yield
+        return
+    modules = len(sys.modules)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _first_loads[name] = {"seconds": seconds, "modules": len(sys.modules) - modules}
+        logger.info("%s first load %.1f ms, %d new modules", name, seconds * 1e3, len(sys.modules) - modules)
+
+
+# Sidebar summary; the first call also fixes the cold start (launcher plus first page)
+def render_report():
+    global _cold_start
+    if _cold_start is None:
+        _cold_start = time.perf_counter() - _booted
+        logger.info("cold start %.1f ms", _cold_start * 1e3)
+    with st.sidebar.expander("Startup"):
+        st.write(f"Cold start {_cold_start * 1e3:.0f} ms, {len(sys.modules)} modules loaded")
+        warm = _warmup
+        if warm["seconds"] is not None:
+            st.write(f"Prewarm {warm['status']}: {warm['functions']} functions in {warm['seconds']:.2f} s {warm['error']}")
+        else:
+            st.write(f"Prewarm {warm['status']}")
+        rows = {name: load for name, load in _first_loads.items() if load is not None}
+        if rows:
+            st.dataframe({
+                "page": list(rows),
+                "first load (ms)": [load["seconds"] * 1e3 for load in rows.values()],
+                "new modules": [load["modules"] for load in rows.values()],
+            })
@@ -1,9 +1,15 @@
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.integrate import quad
+import csv
+import io
 
-st.set_option('deprecation.showPyplotGlobalUse', False)
+from integration import evaluate_vectorized, integrate_expression, integrate_many
+from jobs import report_progress, run_in_background
+from matrix_batch import analyze_stack, is_singular, load_matrix_stack
+from matrix_io import content_hash
+from safe_expr import compile_numeric
+from tracing import page, span
 
 def area_under_curve():
     st.header("Area Under Curve")
@@ -13,18 +19,48 @@ def area_under_curve():
 
     if st.button("Calculate Area"):
         try:
-            func = eval(f"lambda x: {func_input}")
-            area, _ = quad(func, a, b)
+            func = compile_numeric(func_input)
+            # quad on a badly behaved integrand can take arbitrarily long, so it runs under a time limit
+            with span("quad"):
+                area, _ = run_in_background("Integrating", (func_input, a, b), integrate_expression, func_input, a, b)
             st.write(f"The area under the curve {func_input} from {a} to {b} is: {area:.4f}")
 
-            x = np.linspace(a, b, 100)
-            y = [func(x_val) for x_val in x]
-            fig, ax = plt.subplots()
-            ax.plot(x, y)
-            ax.set_xlabel("x")
-            ax.set_ylabel("y")
-            ax.set_title(f"Area Under Curve: {func_input}")
-            st.pyplot(fig)
+            with span("plot"):
+                x = np.linspace(a, b, 100)
+                y = evaluate_vectorized(func, x)
+                fig, ax = plt.subplots()
+                ax.plot(x, y)
+                ax.set_xlabel("x")
+                ax.set_ylabel("y")
+                ax.set_title(f"Area Under Curve: {func_input}")
+                st.pyplot(fig)
+                plt.close(fig)
+        except Exception as e:
+            st.error(f"Error: {e}")
+
+def batch_area_under_curve():
+    st.header("Batch Area Under Curve")
+    uploaded = st.file_uploader("Upload a CSV with columns function, a, b:", type=["csv"], key="area_batch")
+
+    if uploaded is not None and st.button("Calculate Areas"):
+        try:
+            key = content_hash(uploaded.getvalue())
+            rows = list(csv.DictReader(io.TextIOWrapper(uploaded, encoding="utf-8")))
+            functions = [row["function"] for row in rows]
+            a = [float(row["a"]) for row in rows]
+            b = [float(row["b"]) for row in rows]
+            with span("batch integrate"):
+                area, error, messages = run_in_background("Integrating", key, integrate_many, functions, a, b, compile_numeric,
+                                                          progress=report_progress)
+
+            results = {"function": functions, "a": a, "b": b, "area": area, "error": error, "message": messages}
+            st.dataframe(results)
+
+            out = io.StringIO()
+            writer = csv.writer(out)
+            writer.writerow(results.keys())
+            writer.writerows(zip(*results.values()))
+            st.download_button("Download results", out.getvalue(), file_name="areas.csv", mime="text/csv")
         except Exception as e:
             st.error(f"Error: {e}")
 
@@ -37,8 +73,9 @@ def determinant_product():
         try:
             matrix1 = np.array([[float(x) for x in row.split()] for row in matrix1.split('\n')])
             matrix2 = np.array([[float(x) for x in row.split()] for row in matrix2.split('\n')])
-            det1 = np.linalg.det(matrix1)
-            det2 = np.linalg.det(matrix2)
+            with span("det"):
+                det1 = np.linalg.det(matrix1)
+                det2 = np.linalg.det(matrix2)
             product = det1 * det2
             st.write(f"Determinant of the first matrix: {det1:.4f}")
             st.write(f"Determinant of the second matrix: {det2:.4f}")
@@ -53,16 +90,34 @@ def check_singularity():
     if st.button("Check Singularity"):
         try:
             matrix = np.array([[float(x) for x in row.split()] for row in matrix_input.split('\n')])
-            det = np.linalg.det(matrix)
-            if np.isclose(det, 0):
+            with span("singularity"):
+                singular = is_singular(matrix)
+            if singular:
                 st.write("The matrix is singular.")
             else:
                 st.write("The matrix is non-singular.")
         except Exception as e:
             st.error(f"Error: {e}")
 
+def batch_singularity():
+    st.header("Batch Determinant and Singularity")
+    uploaded = st.file_uploader("Upload an (N, n, n) .npy stack or a CSV with one flattened matrix per row:", type=["npy", "csv"], key="matrix_batch")
+
+    if uploaded is not None and st.button("Analyze Matrices"):
+        try:
+            stack = load_matrix_stack(uploaded.name, uploaded.getvalue())
+            with span("batch analyze"):
+                results = analyze_stack(stack)
+            st.write(f"{stack.shape[0]} matrices of order {stack.shape[1]}x{stack.shape[2]}, {int(results['singular'].sum())} singular.")
+            st.dataframe(results)
+        except Exception as e:
+            st.error(f"Error: {e}")
+
 st.title("Matrix Operations")
 
-area_under_curve()
-determinant_product()
-check_singularity()
\ No newline at end of file
+with page("task1"):
+    area_under_curve()
+    batch_area_under_curve()
+    determinant_product()
+    check_singularity()
+    batch_singularity()
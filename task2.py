@@ -1,21 +1,39 @@
 import streamlit as st
 import sympy as sp
 import numpy as np
-import matplotlib.pyplot as plt
 
+from expr_cache import compile_expression
+from figure_cache import render_png
+from safe_expr import to_sympy
+from sampling import adaptive_sample
+from tracing import page, span
+
+x = sp.Symbol('x')
+functions = {
+    "Polynomial (x³ - 2x² + 3x - 1)": x**3 - 2*x**2 + 3*x - 1,
+    "Trigonometric (sin(x))": sp.sin(x),
+    "Exponential (e^x)": sp.exp(x),
+    "Logarithmic (ln(x))": sp.log(x),
+    "Rational (1 / (1 + x²))": 1 / (1 + x**2)
+}
+
+# Render the plot to PNG bytes; identical (expression, x_val, x_range) requests are served from the cache
 def plot_function_and_tangent(func, x_val, x_range=(-10, 10)):
-    x = sp.Symbol('x')
-    f = sp.lambdify(x, func, "numpy")
-    derivative = sp.diff(func, x)
-    df = sp.lambdify(x, derivative, "numpy")
+    key = (sp.srepr(func), float(x_val), tuple(float(v) for v in x_range))
+    with span("plot"):
+        return render_png(key, lambda fig: draw_function_and_tangent(fig, func, x_val, x_range))
+
+def draw_function_and_tangent(fig, func, x_val, x_range):
+    with span("compile"):
+        compiled = compile_expression(func)
+    f = compiled.numeric(0)
     
-    x_vals = np.linspace(x_range[0], x_range[1], 1000)
-    y_vals = f(x_vals)
+    with span("sample"):
+        x_vals, y_vals = adaptive_sample(f, x_range[0], x_range[1], max_points=1000)
     
-    slope = df(x_val)
-    y_val = f(x_val)
+    y_val, slope = compiled.evaluate(x_val, (0, 1))
     
-    fig, ax = plt.subplots()
+    ax = fig.subplots()
     ax.plot(x_vals, y_vals, label=f'f(x) = {sp.latex(func)}')
     ax.plot(x_val, y_val, 'ro', label='Point')
     
@@ -29,26 +47,25 @@ def plot_function_and_tangent(func, x_val, x_range=(-10, 10)):
     ax.grid(alpha=0.3)
     ax.legend()
     ax.set_title(f'Function and Tangent Line at x = {x_val}')
-    return fig
 
 def display_derivative(func, var):
-    derivative = sp.diff(func, var)
+    with span("derivative"):
+        derivative = compile_expression(func, var=var).derivative(1)
     st.latex(f"f(x) = {sp.latex(func)}")
     st.latex(f"f'(x) = {sp.latex(derivative)}")
 
+# Compile and render the built-in functions at the page's default inputs, so a first
+# visit is served from the expression and PNG caches
+def prewarm(x_val=1.0, x_range=(-5.0, 5.0)):
+    for func in functions.values():
+        compile_expression(func, var=x).derivative(1)
+        plot_function_and_tangent(func, x_val, x_range)
+    return len(functions)
+
 def main():
     st.title("Derivative Explorer with Tangent Lines")
     st.write("Visualize functions, their derivatives, and tangent lines.")
 
-    x = sp.Symbol('x')
-    functions = {
-        "Polynomial (x³ - 2x² + 3x - 1)": x**3 - 2*x**2 + 3*x - 1,
-        "Trigonometric (sin(x))": sp.sin(x),
-        "Exponential (e^x)": sp.exp(x),
-        "Logarithmic (ln(x))": sp.log(x),
-        "Rational (1 / (1 + x²))": 1 / (1 + x**2)
-    }
-
     st.header("Visualize Function and Its Tangent")
     selected_func = st.selectbox("Choose a function:", list(functions.keys()))
     func = functions[selected_func]
@@ -60,8 +77,8 @@ def main():
         x_min = st.number_input("Min x-value for graph:", value=-5.0, step=0.5)
         x_max = st.number_input("Max x-value for graph:", value=5.0, step=0.5)
 
-    fig = plot_function_and_tangent(func, x_val, (x_min, x_max))
-    st.pyplot(fig)
+    png = plot_function_and_tangent(func, x_val, (x_min, x_max))
+    st.image(png)
 
     st.write("The derivative of the selected function:")
     display_derivative(func, x)
@@ -76,11 +93,11 @@ def main():
     f_input = st.text_input("Enter a function f(x):", "sin(x)")
     if st.button("Calculate and Plot d/dx[c * f(x)]"):
         try:
-            f = sp.sympify(f_input)
+            f = to_sympy(f_input)
             display_derivative(c * f, x)
-            fig = plot_function_and_tangent(c * f, x_val, (x_min, x_max))
-            st.pyplot(fig)
-        except sp.SympifyError:
+            png = plot_function_and_tangent(c * f, x_val, (x_min, x_max))
+            st.image(png)
+        except ValueError:
             st.error("Invalid input. Please enter a valid function.")
 
     st.subheader("2. Sum Rule")
@@ -91,13 +108,13 @@ def main():
     g_sum = st.text_input("Enter function g(x):", "log(x)")
     if st.button("Calculate and Plot d/dx[f(x) + g(x)]"):
         try:
-            f = sp.sympify(f_sum)
-            g = sp.sympify(g_sum)
+            f = to_sympy(f_sum)
+            g = to_sympy(g_sum)
             sum_func = f + g
             display_derivative(sum_func, x)
-            fig = plot_function_and_tangent(sum_func, x_val, (x_min, x_max))
-            st.pyplot(fig)
-        except sp.SympifyError:
+            png = plot_function_and_tangent(sum_func, x_val, (x_min, x_max))
+            st.image(png)
+        except ValueError:
             st.error("Invalid input. Please enter valid functions.")
 
     st.subheader("3. Product Rule")
@@ -108,13 +125,13 @@ def main():
     g_prod = st.text_input("Enter function g(x):", "sin(x)")
     if st.button("Calculate and Plot d/dx[f(x) * g(x)]"):
         try:
-            f = sp.sympify(f_prod)
-            g = sp.sympify(g_prod)
+            f = to_sympy(f_prod)
+            g = to_sympy(g_prod)
             prod_func = f * g
             display_derivative(prod_func, x)
-            fig = plot_function_and_tangent(prod_func, x_val, (x_min, x_max))
-            st.pyplot(fig)
-        except sp.SympifyError:
+            png = plot_function_and_tangent(prod_func, x_val, (x_min, x_max))
+            st.image(png)
+        except ValueError:
             st.error("Invalid input. Please enter valid functions.")
 
     st.subheader("4. Quotient Rule")
@@ -125,25 +142,26 @@ def main():
     g_quot = st.text_input("Enter function g(x) (denominator):", "1 + x^2")
     if st.button("Calculate and Plot d/dx[f(x) / g(x)]"):
         try:
-            f = sp.sympify(f_quot)
-            g = sp.sympify(g_quot)
+            f = to_sympy(f_quot)
+            g = to_sympy(g_quot)
             quot_func = f / g
             display_derivative(quot_func, x)
-            fig = plot_function_and_tangent(quot_func, x_val, (x_min, x_max))
-            st.pyplot(fig)
-        except sp.SympifyError:
+            png = plot_function_and_tangent(quot_func, x_val, (x_min, x_max))
+            st.image(png)
+        except ValueError:
             st.error("Invalid input. Please enter valid functions.")
                 
     st.header("Explore Your Own Function")
     user_input = st.text_input("Enter a function (using 'x' as the variable):", "x^2 * sin(x)")
     if st.button("Calculate and Plot d/dx[Your Function]"):
         try:
-            user_func = sp.sympify(user_input)
+            user_func = to_sympy(user_input)
             display_derivative(user_func, x)
-            fig = plot_function_and_tangent(user_func, x_val, (x_min, x_max))
-            st.pyplot(fig)
-        except sp.SympifyError:
+            png = plot_function_and_tangent(user_func, x_val, (x_min, x_max))
+            st.image(png)
+        except ValueError:
             st.error("Invalid input. Please enter a valid function.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with page("task2"):
+        main()
\ No newline at end of file
@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+
+import pytest
+
+from clue_store import ClueStore, ConnectionPool, SQLiteBackend
+
+
+def make_backend(tmp_path, count, pool_size=2):
+    backend = SQLiteBackend(str(tmp_path / "clues.db"), pool_size=pool_size)
+    backend.create_schema([(f"clue {i}", f"suspect {i % 3}") for i in range(count)])
+    return backend
+
+
+def add_clue(backend, clue):
+    with backend.pool.connection() as conn:
+        conn.execute("INSERT INTO clues (clue, suspect) VALUES (?, ?)", (clue, "someone"))
+        conn.commit()
+
+
+@pytest.mark.parametrize("count", [0, 1, 7, 10, 23])
+def test_pagination_returns_every_row_in_order(tmp_path, count):
+    store = ClueStore(make_backend(tmp_path, count), page_size=5)
+    rows = list(store.iter_clues())
+    assert [row[1] for row in rows] == [f"clue {i}" for i in range(count)]
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+
+
+# Mimics mysql.connector's unbuffered cursor: closing it before the end-of-result packet
+# has been read (fetchmany that returned a full batch) raises "Unread result found"
+class UnbufferedCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.exhausted = True
+
+    def execute(self, sql, params):
+        self.cursor.execute(sql, params)
+        self.exhausted = False
+
+    def fetchmany(self, size):
+        rows = self.cursor.fetchmany(size)
+        self.exhausted = len(rows) < size
+        return rows
+
+    def fetchall(self):
+        self.exhausted = True
+        return self.cursor.fetchall()
+
+    def close(self):
+        if not self.exhausted:
+            raise RuntimeError("Unread result found")
+        self.cursor.close()
+
+
+class UnbufferedBackend:
+    placeholder = "?"
+
+    def __init__(self, path):
+        self.pool = ConnectionPool(lambda: UnbufferedConnection(path), lambda conn: True)
+
+
+class UnbufferedConnection:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self):
+        return UnbufferedCursor(self.conn.cursor())
+
+    def close(self):
+        self.conn.close()
+
+
+def test_exactly_full_pages_work_with_unbuffered_cursors(tmp_path):
+    make_backend(tmp_path, 10)
+    store = ClueStore(UnbufferedBackend(str(tmp_path / "clues.db")), page_size=5)
+    assert len(list(store.iter_clues())) == 10
+
+
+def test_cache_serves_reads_until_ttl_or_invalidate(tmp_path):
+    backend = make_backend(tmp_path, 3)
+    store = ClueStore(backend, ttl=60.0)
+    first = store.get_clues()
+    add_clue(backend, "late clue")
+    assert store.get_clues() is first
+    store.invalidate()
+    refreshed = store.get_clues()
+    assert len(refreshed) == 4
+    assert refreshed[-1][1] == "late clue"
+
+
+def test_expired_cache_is_reloaded(tmp_path):
+    backend = make_backend(tmp_path, 3)
+    store = ClueStore(backend, ttl=0.0)
+    store.get_clues()
+    add_clue(backend, "late clue")
+    assert len(store.get_clues()) == 4
+
+
+def test_concurrent_readers_share_one_load(tmp_path):
+    store = ClueStore(make_backend(tmp_path, 50), page_size=8)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get_clues())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+
+
+def test_pool_reuses_connections(tmp_path):
+    backend = make_backend(tmp_path, 1)
+    with backend.pool.connection() as first:
+        pass
+    with backend.pool.connection() as second:
+        pass
+    assert second is first
+
+
+def test_pool_is_bounded(tmp_path):
+    pool = SQLiteBackend(str(tmp_path / "clues.db"), pool_size=1).pool
+    pool.timeout = 0.05
+    conn = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    pool.release(conn)
+    pool.release(pool.acquire())
+
+
+def test_pool_discards_connection_after_error(tmp_path):
+    backend = make_backend(tmp_path, 1)
+    with pytest.raises(sqlite3.OperationalError):
+        with backend.pool.connection() as broken:
+            broken.execute("SELECT * FROM missing_table")
+    with backend.pool.connection() as conn:
+        assert conn is not broken
+
+
+def test_pool_replaces_unhealthy_idle_connection(tmp_path):
+    backend = make_backend(tmp_path, 1)
+    with backend.pool.connection() as stale:
+        pass
+    stale.close()
+    with backend.pool.connection() as conn:
+        assert conn is not stale
+        assert conn.execute("SELECT COUNT(*) FROM clues").fetchone() == (1,)
+
+
+def test_pool_releases_slot_when_connect_fails():
+    calls = []
+
+    def connect():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("unavailable")
+        return sqlite3.connect(":memory:")
+
+    pool = ConnectionPool(connect, lambda conn: True, size=1, timeout=0.05)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.acquire()
+    pool.release(pool.acquire())
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+
+import out_of_core
+import vector_stream
+from out_of_core import BlockedLU, blocked_lu, blocked_matmul, memmap_key, out_of_core_operation
+
+# Small enough that a few hundred rows span several tiles and panels
+BUDGET = 4 * 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def output_dir(tmp_path, monkeypatch):
+    directory = str(tmp_path / "out")
+    monkeypatch.setattr(out_of_core, "OUTPUT_DIR", directory)
+    monkeypatch.setattr(vector_stream, "OUTPUT_DIR", directory)
+    return directory
+
+
+def memmap(tmp_path, name, array):
+    path = str(tmp_path / name)
+    np.save(path, array)
+    return np.load(path, mmap_mode="r")
+
+
+@pytest.mark.parametrize("dtype, tol", [(np.float64, 1e-10), (np.float32, 1e-3)])
+def test_blocked_matmul_matches_numpy(tmp_path, dtype, tol):
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((700, 530)).astype(dtype)
+    b = rng.standard_normal((530, 610)).astype(dtype)
+    updates = []
+    result = blocked_matmul(memmap(tmp_path, "a.npy", a), memmap(tmp_path, "b.npy", b), budget=BUDGET,
+                            progress=lambda fraction, message: updates.append(fraction))
+    assert len(updates) > 1 and updates[-1] == 1.0
+    assert result.matrix.dtype == dtype
+    np.testing.assert_allclose(result.matrix, a @ b, atol=tol)
+
+
+def test_blocked_matmul_rejects_mismatched_shapes(tmp_path):
+    a = memmap(tmp_path, "a.npy", np.ones((4, 3)))
+    with pytest.raises(ValueError):
+        blocked_matmul(a, a, budget=BUDGET)
+
+
+def test_blocked_lu_spans_several_panels(tmp_path):
+    rng = np.random.default_rng(1)
+    m = rng.standard_normal((517, 517))
+    factors = blocked_lu(memmap(tmp_path, "m.npy", m), budget=BUDGET)
+    assert factors.block < m.shape[0]
+
+    sign, logdet = factors.slogdet()
+    expected_sign, expected_logdet = np.linalg.slogdet(m)
+    assert sign == expected_sign
+    assert logdet == pytest.approx(expected_logdet)
+
+    b = rng.standard_normal((517, 3))
+    np.testing.assert_allclose(m @ factors.solve(b), b, atol=1e-9)
+    np.testing.assert_allclose(m @ factors.solve(b[:, 0]), b[:, 0], atol=1e-9)
+    np.testing.assert_allclose(factors.inverse().matrix @ m, np.eye(517), atol=1e-9)
+
+
+def test_singular_matrix_has_zero_determinant_and_cannot_be_solved(tmp_path):
+    factors = blocked_lu(memmap(tmp_path, "s.npy", np.ones((200, 200))), budget=BUDGET)
+    assert factors.det() == 0.0
+    with pytest.raises(np.linalg.LinAlgError):
+        factors.solve(np.ones(200))
+
+
+def test_keyed_results_are_reused_and_inverse_keeps_the_pivots(tmp_path):
+    rng = np.random.default_rng(2)
+    m = memmap(tmp_path, "m.npy", rng.standard_normal((300, 300)))
+    first = out_of_core_operation("Inverse", m, key="m", budget=BUDGET)
+    factors = blocked_lu(m, key="m", budget=BUDGET)
+    assert os.path.exists(factors.path) and os.path.exists(factors.piv_path)
+    second = out_of_core_operation("Inverse", m, key="m", budget=BUDGET)
+    assert not first.cached and second.cached
+
+
+def test_inverse_output_does_not_prune_its_factors(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_stream, "MAX_OUTPUT_BYTES", 0)
+    m = memmap(tmp_path, "m.npy", np.random.default_rng(3).standard_normal((200, 200)))
+    factors = blocked_lu(m, key="m", budget=BUDGET)
+    factors.inverse(key="m")
+    assert os.path.exists(factors.path) and os.path.exists(factors.piv_path)
+
+
+@pytest.mark.parametrize("budget, batches", [(BUDGET, 1), (BUDGET // 2, 9)])
+def test_inverse_substitutes_as_many_columns_as_fit(tmp_path, monkeypatch, budget, batches):
+    m = np.random.default_rng(4).standard_normal((517, 517))
+    factors = blocked_lu(memmap(tmp_path, "m.npy", m), budget=budget)
+    widths = []
+    substitute = BlockedLU._substitute
+    monkeypatch.setattr(BlockedLU, "_substitute", lambda self, y, *args: widths.append(y.shape[1]) or substitute(self, y, *args))
+    inverse = factors.inverse()
+    assert len(widths) == batches and sum(widths) == 517
+    np.testing.assert_allclose(inverse.matrix @ m, np.eye(517), atol=1e-9)
+
+
+def test_unkeyed_factors_are_deleted(tmp_path, output_dir):
+    m = memmap(tmp_path, "m.npy", np.random.default_rng(5).standard_normal((200, 200)))
+    det = out_of_core_operation("Determinant", m, budget=BUDGET)
+    assert det == pytest.approx(np.linalg.det(m))
+    inverse = out_of_core_operation("Inverse", m, budget=BUDGET)
+    assert os.listdir(output_dir) == [os.path.basename(inverse.path)]
+
+
+def test_memmap_key_follows_the_file(tmp_path):
+    m = memmap(tmp_path, "m.npy", np.ones((4, 4)))
+    assert memmap_key(m) == memmap_key(np.load(m.filename, mmap_mode="r"))
+    assert memmap_key(m, None) == memmap_key(m) != memmap_key(m, m)
+    assert memmap_key(m[1:]) is None and memmap_key(np.ones((4, 4))) is None
+    before = memmap_key(m)
+    os.utime(m.filename, ns=(0, 0))
+    assert memmap_key(np.load(m.filename, mmap_mode="r")) != before
+
+
+def test_budget_too_small(tmp_path):
+    with pytest.raises(ValueError):
+        blocked_lu(memmap(tmp_path, "big.npy", np.zeros((5000, 5000), np.float32)), budget=BUDGET)
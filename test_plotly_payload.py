@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from plotly_payload import downsample
+
+
+def test_downsample_keeps_endpoints_within_budget():
+    x = np.linspace(0, 10, 5000)
+    dx, dy = downsample(x, np.sin(x), 400)
+    assert dx.size <= 400
+    assert dx[0] == 0 and dx[-1] == 10
+
+
+@pytest.mark.parametrize("segments, max_points", [(200, 50), (40, 400), (3, 10)])
+def test_many_segments_stay_within_budget(segments, max_points):
+    x = np.linspace(0, 1, 10_000)
+    y = np.sin(50 * x)
+    y[np.linspace(0, x.size - 1, segments + 1).astype(int)[1:-1]] = np.nan
+    dx, dy = downsample(x, y, max_points)
+    assert dx.size <= max_points
+    assert np.count_nonzero(np.isnan(dy)) == min(segments, (max_points + 1) // 4) - 1
+    assert not np.isnan(dy[0]) and not np.isnan(dy[-1])
@@ -0,0 +1,18 @@
+import pytest
+
+from safe_expr import ExpressionError, compile_numeric, to_sympy
+
+
+@pytest.mark.parametrize("text", ["9**9**9", "9^9^9", "power(9, power(9, 9))", "(1/3)**(10**6)",
+                                  "sqrt(2)**(10**100)", "sin(2**(9**9))"])
+def test_huge_constant_powers_are_rejected(text):
+    with pytest.raises(ExpressionError):
+        to_sympy(text)
+    with pytest.raises(ExpressionError):
+        compile_numeric(text)
+
+
+@pytest.mark.parametrize("text, expected", [("2**10 + x**3", "x**3 + 1024"), ("x**(10**6)", "x**1000000"),
+                                            ("(-1)**(10**50)", "1"), ("2**-3", "1/8")])
+def test_reasonable_powers_still_build(text, expected):
+    assert str(to_sympy(text)) == expected
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+import scipy.sparse as sps
+
+from sparse_ops import _permutation_sign, factorize_sparse
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 50])
+def test_permutation_sign_matches_determinant(n):
+    rng = np.random.default_rng(n)
+    for _ in range(20):
+        perm = rng.permutation(n)
+        assert _permutation_sign(perm) == round(np.linalg.det(np.eye(n)[perm]) if n else 1.0)
+
+
+def test_permutation_sign_of_one_long_cycle():
+    assert _permutation_sign(np.roll(np.arange(100_000), 1)) == -1.0
+    assert _permutation_sign(np.roll(np.arange(100_001), 1)) == 1.0
+
+
+def test_sparse_determinant_matches_dense():
+    dense = np.random.default_rng(3).standard_normal((60, 60)) * (np.random.default_rng(4).random((60, 60)) < 0.2)
+    dense += 4 * np.eye(60)
+    assert factorize_sparse(sps.csr_matrix(dense)).det() == pytest.approx(np.linalg.det(dense))
@@ -0,0 +1,23 @@
+import math
+
+import numpy as np
+import pytest
+
+from vector_stream import stream_dot, summarize
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_stream_dot_matches_exact_sum(dtype):
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal(100_003).astype(dtype)
+    b = rng.standard_normal(100_003).astype(dtype)
+    exact = math.fsum(np.multiply(a, b, dtype=np.float64))
+    assert stream_dot(a, b, chunk_size=4096) == pytest.approx(exact, rel=1e-12)
+
+
+def test_summarize_float32():
+    values = np.random.default_rng(1).standard_normal(50_000).astype(np.float32)
+    stats = summarize(values, chunk_size=4096)
+    reference = values.astype(np.float64)
+    assert stats["mean"] == pytest.approx(math.fsum(reference) / reference.size, rel=1e-10)
+    assert stats["norm"] == pytest.approx(math.sqrt(math.fsum(reference * reference)), rel=1e-12)
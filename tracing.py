@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import streamlit as st
+
+# Append every finished trace to this JSONL file when set
+EXPORT_PATH = os.environ.get("TRACE_FILE")
+# Reruns kept per session for the rolling percentiles
+HISTORY = 200
+
+_local = threading.local()
+_export_lock = threading.Lock()
+_disabled = nullcontext()
+
+
+# Spans recorded during one script rerun, as (name, depth, start, duration) relative to the rerun start
+class Trace:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.perf_counter()
+        self.wall = time.time()
+        self.spans = []
+        self.notes = {}
+        self.depth = 0
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        index = len(self.spans)
+        self.spans.append([name, self.depth, start - self.started, 0.0])
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self.spans[index][3] = time.perf_counter() - start
+
+    def to_dict(self):
+        return {
+            "page": self.page,
+            "timestamp": self.wall,
+            "total_ms": (time.perf_counter() - self.started) * 1e3,
+            "spans": [
+                {"name": name, "depth": depth, "start_ms": start * 1e3, "duration_ms": duration * 1e3}
+                for name, depth, start, duration in self.spans
+            ],
+            "notes": dict(self.notes),
+        }
+
+
+# Time a stage of the current rerun; a shared no-op context when tracing is off
+def span(name):
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _disabled
+    return trace.span(name)
+
+
+def tracing_active():
+    return getattr(_local, "trace", None) is not None
+
+
+# Attach a measured value, such as a payload size, to the current rerun; a no-op when tracing is off
+def note(name, value):
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.notes[name] = value
+
+
+def _enabled():
+    return st.query_params.get("trace", "").lower() in ("1", "true", "yes")
+
+
+# Wrap one rerun of a page; tracing is switched on with ?trace=1 in the URL
+@contextmanager
+def page(name):
+    if not _enabled():
+        yield
+        return
+    trace = Trace(name)
+    _local.trace = trace
+    try:
+        yield
+    finally:
+        _local.trace = None
+        record = trace.to_dict()
+        _export(record)
+        _render(record)
+
+
+def _export(record):
+    if not EXPORT_PATH:
+        return
+    with _export_lock, open(EXPORT_PATH, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(record) + "\n")
+
+
+def _render(record):
+    history = st.session_state.setdefault("_trace_history", deque(maxlen=HISTORY))
+    history.append(record)
+
+    sidebar = st.sidebar
+    sidebar.subheader(f"Trace: {record['total_ms']:.1f} ms")
+    scale = 30 / max(record["total_ms"], 1e-9)
+    lines = []
+    for s in record["spans"]:
+        offset = int(s["start_ms"] * scale)
+        width = max(1, int(round(s["duration_ms"] * scale)))
+        label = "  " * s["depth"] + s["name"]
+        lines.append(f"`{' ' * offset}{'█' * width:<{31 - offset}}` {label} {s['duration_ms']:.1f} ms")
+    sidebar.markdown("  \n".join(lines) or "No spans recorded.")
+    for name, value in record["notes"].items():
+        sidebar.caption(f"{name}: {value:,}" if isinstance(value, int) else f"{name}: {value}")
+
+    durations = defaultdict(list)
+    for past in history:
+        for s in past["spans"]:
+            durations[s["name"]].append(s["duration_ms"])
+    sidebar.caption(f"Rolling percentiles over the last {len(history)} reruns (ms)")
+    sidebar.dataframe({
+        "span": list(durations),
+        "n": [len(v) for v in durations.values()],
+        "p50": [float(np.percentile(v, 50)) for v in durations.values()],
+        "p95": [float(np.percentile(v, 95)) for v in durations.values()],
+        "max": [max(v) for v in durations.values()],
+    })
+    sidebar.download_button(
+        "Export traces (JSONL)",
+        "".join(json.dumps(r) + "\n" for r in history),
+        file_name=f"{record['page']}-traces.jsonl",
+    )
@@ -0,0 +1,228 @@
+import math
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from matrix_io import content_hash, spool_upload
+
+# Streamed results are written here as memory-mapped .npy files
+OUTPUT_DIR = os.path.join(tempfile.gettempdir(), "maths-for-dl-vectors")
+# Oldest results are deleted once the directory grows past this
+MAX_OUTPUT_BYTES = 4 * 1024 * 1024 * 1024
+# Elements per chunk (8 MB of float64); each thread keeps one product buffer this size
+CHUNK_SIZE = 1 << 20
+WORKERS = os.cpu_count() or 1
+# Server-side files can only be opened from under this directory; unset, only uploads are allowed
+DATA_DIR = os.environ.get("LARGE_DATA_DIR")
+# Raw binary files carry no header, so the element type is chosen by the user
+RAW_DTYPES = ["float64", "float32"]
+
+UFUNCS = {"Addition": np.add, "Subtraction": np.subtract}
+
+_local = threading.local()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="vector-stream")
+        return _pool
+
+
+# A memory-mapped input vector and the key its results are cached under
+class VectorSource:
+    def __init__(self, vector, key, path):
+        self.vector = vector
+        self.key = key
+        self.path = path
+
+    def __len__(self):
+        return self.vector.shape[0]
+
+
+def _as_vector(array):
+    if array.size == 0:
+        raise ValueError("The vector is empty.")
+    if array.ndim != 1:
+        if not array.flags.c_contiguous:
+            raise ValueError(f"Expected a vector, got a non-contiguous array of shape {array.shape}.")
+        array = array.reshape(-1)
+    return array
+
+
+# Resolve a user-entered path under DATA_DIR; absolute paths, .. and symlinks cannot leave it
+def resolve_data_path(path):
+    if not DATA_DIR:
+        raise ValueError("Opening files on the server is disabled; set LARGE_DATA_DIR to allow it.")
+    root = os.path.realpath(DATA_DIR)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Only files under {DATA_DIR} can be opened.")
+    return resolved
+
+
+# Memory-map a .npy file, or a headerless binary file of the given dtype
+def open_vector(path, dtype="float64"):
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        raise ValueError("The vector is empty.")
+    if path.lower().endswith(".npy"):
+        vector = np.load(path, mmap_mode="r", allow_pickle=False)
+        if not np.issubdtype(vector.dtype, np.number):
+            raise ValueError(f"Expected numeric data, got {vector.dtype}.")
+    else:
+        itemsize = np.dtype(dtype).itemsize
+        if stat.st_size % itemsize:
+            raise ValueError(f"File size {stat.st_size} is not a multiple of the {dtype} item size ({itemsize}).")
+        vector = np.memmap(path, dtype=dtype, mode="r")
+    key = content_hash(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{dtype}".encode())
+    return VectorSource(_as_vector(vector), key, path)
+
+
+# Spool an uploaded file to disk and memory-map it
+def open_upload(name, data, dtype="float64"):
+    suffix = ".npy" if name.lower().endswith(".npy") else ".bin"
+    key = content_hash(f"{suffix}:{dtype}:".encode(), data)
+    source = open_vector(spool_upload(key, data, suffix), dtype)
+    source.key = key
+    return source
+
+
+def _chunks(n, chunk_size):
+    return [(lo, min(lo + chunk_size, n)) for lo in range(0, n, chunk_size)]
+
+
+def _buffer(n):
+    buf = getattr(_local, "buffer", None)
+    if buf is None or buf.size < n:
+        buf = np.empty(n)
+        _local.buffer = buf
+    return buf[:n]
+
+
+# numpy's sum is pairwise, so each chunk's error grows with log(chunk), not chunk;
+# dtype forces the float64 loop so float32 inputs are not rounded before the sum
+def _dot_chunk(a, b, lo, hi):
+    buf = _buffer(hi - lo)
+    np.multiply(a[lo:hi], b[lo:hi], out=buf, dtype=np.float64)
+    return float(buf.sum())
+
+
+# Pairwise sums per chunk, combined exactly with fsum, so accuracy holds at 10^8+ elements
+def stream_dot(a, b, chunk_size=CHUNK_SIZE):
+    _check_lengths(a, b)
+    partials = _executor().map(lambda r: _dot_chunk(a, b, *r), _chunks(a.shape[0], chunk_size))
+    return math.fsum(partials)
+
+
+def _chunk_stats(values):
+    if values.dtype != np.float64:
+        values = values.astype(np.float64)
+    return float(values.min()), float(values.max()), float(values.sum()), float(np.dot(values, values))
+
+
+def _combine(n, stats):
+    lows, highs, sums, squares = zip(*stats)
+    return {
+        "length": n,
+        "min": min(lows),
+        "max": max(highs),
+        "mean": math.fsum(sums) / n,
+        "norm": math.sqrt(math.fsum(squares)),
+    }
+
+
+# Length, min, max, mean and L2 norm of a vector, read one chunk at a time
+def summarize(vector, chunk_size=CHUNK_SIZE):
+    stats = _executor().map(lambda r: _chunk_stats(vector[r[0]:r[1]]), _chunks(vector.shape[0], chunk_size))
+    return _combine(vector.shape[0], list(stats))
+
+
+# Elementwise result stored as a read-only memory-mapped .npy file
+class StreamResult:
+    def __init__(self, path, vector, stats, cached):
+        self.path = path
+        self.vector = vector
+        self.stats = stats
+        self.cached = cached
+
+    def preview(self, count=10):
+        n = self.vector.shape[0]
+        head = np.arange(min(count, n))
+        tail = np.arange(max(count, n - count), n)
+        index = np.concatenate([head, tail])
+        return {"index": index, "value": np.asarray(self.vector[index])}
+
+
+def _elementwise_chunk(ufunc, a, b, out, lo, hi):
+    target = out[lo:hi]
+    ufunc(a[lo:hi], b[lo:hi], out=target)
+    return _chunk_stats(target)
+
+
+# Stream an elementwise operation into OUTPUT_DIR. With a key the result file is reused
+# for the same inputs; it is written to a temporary name first so readers never see half of it.
+def stream_elementwise(operation, a, b, key=None, chunk_size=CHUNK_SIZE):
+    _check_lengths(a, b)
+    ufunc = UFUNCS[operation]
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    name = content_hash(f"{operation}:{key}".encode()) if key else uuid.uuid4().hex
+    path = os.path.join(OUTPUT_DIR, f"{name}.npy")
+    if key and os.path.exists(path):
+        vector = np.load(path, mmap_mode="r")
+        return StreamResult(path, vector, summarize(vector, chunk_size), True)
+
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.result_type(a.dtype, b.dtype), shape=a.shape)
+    try:
+        stats = list(_executor().map(lambda r: _elementwise_chunk(ufunc, a, b, out, *r), _chunks(a.shape[0], chunk_size)))
+        out.flush()
+    except BaseException:
+        del out
+        os.remove(tmp)
+        raise
+    del out
+    os.replace(tmp, path)
+    prune_outputs(path)
+    return StreamResult(path, np.load(path, mmap_mode="r"), _combine(a.shape[0], stats), False)
+
+
+def stream_operation(operation, a, b, key=None, chunk_size=CHUNK_SIZE):
+    if operation == "Dot Product":
+        return stream_dot(a, b, chunk_size)
+    if operation in UFUNCS:
+        return stream_elementwise(operation, a, b, key, chunk_size)
+    raise ValueError(f"Unknown vector operation: {operation}")
+
+
+def _check_lengths(a, b):
+    if a.ndim != 1 or b.ndim != 1:
+        raise ValueError("Streaming operations take 1-D vectors.")
+    if a.shape[0] != b.shape[0]:
+        raise ValueError(f"Vectors must have the same length ({a.shape[0]} vs {b.shape[0]}).")
+
+
+# Delete the oldest result files, other than the ones in keep, until the directory fits
+# MAX_OUTPUT_BYTES. Open memmaps of a deleted file stay valid until they are closed.
+def prune_outputs(*keep):
+    entries = []
+    for entry in os.scandir(OUTPUT_DIR):
+        if entry.name.endswith(".npy") and entry.path not in keep:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries) + sum(os.path.getsize(path) for path in keep)
+    for _, size, path in sorted(entries):
+        if total <= MAX_OUTPUT_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass